@@ -0,0 +1,62 @@
+from array import array
+
+#Operation kinds
+GLYPH = 0  #Character struck with its baseline start at (x, y)
+INK = 1  #Extra pass over a character, classic engine pressure and bleed
+DOT = 2  #Round ink dot of a classic engine splatter, width is its size
+STAMP = 3  #Character handed to the raster engine's ink effects
+RIBBON = 4  #Line faded by ribbon wear, y is its top
+
+
+class DisplayList:
+    #Everything drawn on one page, as flat typed arrays with one entry per
+    #operation rather than a Python object each: about 21 bytes an operation.
+    #Built by PageRenderer from a laid out page and replayed by it onto a
+    #page image; pickles as the raw arrays, so pages can be handed to other
+    #processes and rasterized there with the same settings and seed
+
+    __slots__ = ('index', 'line_offset', 'kinds', 'codepoints', 'xs', 'ys', 'alphas', 'widths')
+
+    def __init__(self, index=0, line_offset=0):
+        self.index = index  #Page number, seeds the per page effects
+        self.line_offset = line_offset  #Lines before the page, for ribbon wear
+        self.kinds = array('B')
+        self.codepoints = array('I')
+        self.xs = array('f')
+        self.ys = array('f')
+        self.alphas = array('f')
+        self.widths = array('f')  #Pen width
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __iter__(self):
+        #(kind, codepoint, x, y, alpha, width) per operation
+        return zip(self.kinds, self.codepoints, self.xs, self.ys, self.alphas, self.widths)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def add(self, kind, codepoint, x, y, alpha=1.0, width=0.0):
+        self.kinds.append(kind)
+        self.codepoints.append(codepoint)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.alphas.append(alpha)
+        self.widths.append(width)
+
+    def extend(self, other):
+        self.kinds.extend(other.kinds)
+        self.codepoints.extend(other.codepoints)
+        self.xs.extend(other.xs)
+        self.ys.extend(other.ys)
+        self.alphas.extend(other.alphas)
+        self.widths.extend(other.widths)
+
+    def nbytes(self):
+        return sum(len(values) * values.itemsize for values in
+                   (self.kinds, self.codepoints, self.xs, self.ys, self.alphas, self.widths))
@@ -0,0 +1,311 @@
+import math
+
+import numpy as np
+from PyQt6.QtGui import QImage, QPainter, QColor, QFontMetrics
+
+
+#Same offsets and strengths as the classic multi-pass pressure redraw
+PRESSURE_VARIATIONS = (
+    (0.2, -0.5, -0.5),
+    (0.3, 0.5, 0.5),
+    (0.4, -0.3, 0.3)
+)
+
+BLEED_PROB = 0.3
+SPLATTER_PROB = 0.2
+MAX_SPLATTER_DOTS = 8
+
+#Precomputed noise variants per glyph, picked at random for every affected glyph
+BLEED_VARIANTS = 4
+SPLATTER_VARIANTS = 16
+
+
+def page_array(page):
+    #View an RGB32 QImage as a (height, width) uint32 array without copying
+    ptr = page.bits()
+    ptr.setsize(page.sizeInBytes())
+    arr = np.frombuffer(ptr, dtype=np.uint32)
+    arr = arr.reshape(page.height(), page.bytesPerLine() // 4)
+    return arr[:, :page.width()]
+
+
+def page_view(page):
+    #Read only page_array, through constBits so a page sharing its buffer,
+    #like one a PageStore unpacked, is not detached into a copy first
+    ptr = page.constBits()
+    ptr.setsize(page.sizeInBytes())
+    arr = np.frombuffer(ptr, dtype=np.uint32)
+    arr = arr.reshape(page.height(), page.bytesPerLine() // 4)
+    return arr[:, :page.width()]
+
+
+def shift(layer, dy, dx):
+    #Shift a 2D layer, ink moved past the border is dropped
+    if not dy and not dx:
+        return layer
+    out = np.zeros_like(layer)
+    height, width = layer.shape
+    out[max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)] = \
+        layer[max(-dy, 0):height + min(-dy, 0), max(-dx, 0):width + min(-dx, 0)]
+    return out
+
+
+def max_filter(layer, radius):
+    #Separable dilation by a square of the given radius
+    out = layer
+    for dy, dx in ((1, 0), (0, 1)):
+        src = out
+        out = src.copy()
+        for r in range(1, radius + 1):
+            np.maximum(out, shift(src, r * dy, r * dx), out=out)
+            np.maximum(out, shift(src, -r * dy, -r * dx), out=out)
+    return out
+
+
+def box_blur(layer, radius):
+    #Separable box blur
+    out = layer
+    for dy, dx in ((1, 0), (0, 1)):
+        src = out
+        out = src.copy()
+        for r in range(1, radius + 1):
+            out += shift(src, r * dy, r * dx)
+            out += shift(src, -r * dy, -r * dx)
+        out /= 2 * radius + 1
+    return out
+
+
+def window_bounds(x, y, width, height, page_width, page_height):
+    #Clip a window to the page, returning page and window slices
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + width, page_width), min(y + height, page_height)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (
+        (slice(y0, y1), slice(x0, x1)),
+        (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+    )
+
+
+def keep_factor(coverage):
+    #Fixed point (x256) fraction of paper brightness left under some ink coverage
+    return np.round((1.0 - coverage) * 256).astype(np.uint32)
+
+
+def darken(arr, x, y, keep):
+    #Scale the gray page pixels under a window by a fixed point keep factor
+    height, width = keep.shape
+    if x < 0 or y < 0 or x + width > arr.shape[1] or y + height > arr.shape[0]:
+        bounds = window_bounds(x, y, width, height, arr.shape[1], arr.shape[0])
+        if bounds is None:
+            return
+        (rows, cols), (wrows, wcols) = bounds
+        keep = keep[wrows, wcols]
+    else:
+        rows, cols = slice(y, y + height), slice(x, x + width)
+    gray = (arr[rows, cols] & 0xff) * keep >> 8
+    arr[rows, cols] = gray * 0x010101 | 0xff000000
+
+
+def scale_ink(band, keep):
+    #Scale the ink of gray page pixels by a fixed point keep factor, paper stays white
+    ink = 255 - (band & 0xff)
+    ink *= keep
+    ink >>= 8
+    band[...] = (255 - ink) * 0x010101 | 0xff000000
+
+
+class RasterInkEffects:
+    #Ink effects as a post-pass on the page buffer: glyph coverage is rasterized
+    #once per character, the pressure, bleed and splatter stamps derived from it
+    #are cached, and each affected glyph costs a single multiply into the page
+
+    def __init__(self, fonts, effect_scale, seed):
+        self.fonts = fonts
+        self.metrics = fonts.metrics
+        self.effect_scale = effect_scale
+        self.pad = int(math.ceil(3 * effect_scale)) + 1
+        self.seed = seed
+        self.stamps = {}
+        self.splatters = self.make_splatters()
+        self.pending = []
+
+    def glyph_coverage(self, char):
+        #Clean antialiased coverage of one character in [0, 1], with a padded border
+        width = self.fonts.advance(char) + 2 * self.pad
+        height = self.metrics.height() + 2 * self.pad
+        image = QImage(width, height, QImage.Format.Format_Grayscale8)
+        image.fill(0)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self.fonts.font_for(char))
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawText(self.pad, self.pad + self.metrics.ascent(), char)
+        painter.end()
+
+        ptr = image.constBits()
+        ptr.setsize(image.sizeInBytes())
+        pixels = np.frombuffer(ptr, dtype=np.uint8).reshape(height, image.bytesPerLine())
+        return pixels[:, :width].astype(np.float32) / 255.0
+
+    def make_stamps(self, char):
+        #Seeded per character so stamps do not depend on the order pages render in
+        rng = np.random.default_rng([self.seed, ord(char)])
+        glyph = self.glyph_coverage(char)
+
+        #Pressure ghosting, composited like the three faint redraws
+        keep = np.ones_like(glyph)
+        for alpha_mod, dx_mod, dy_mod in PRESSURE_VARIATIONS:
+            dx = int(round(dx_mod * self.effect_scale))
+            dy = int(round(dy_mod * self.effect_scale))
+            keep *= 1.0 - shift(glyph, dy, dx) * alpha_mod
+        stamps = [keep_factor(1.0 - keep)]
+
+        #Ink bleeding: a slightly dilated glyph smeared to a few random offsets,
+        #broken up by a blotchy noise mask
+        spread = max_filter(glyph, 1)
+        reach = 3 * self.effect_scale
+        for _ in range(BLEED_VARIANTS):
+            bleed = keep.copy()
+            for _ in range(rng.integers(2, 6)):
+                dx, dy = np.clip(rng.normal(0, 1, 2) * self.effect_scale, -reach, reach)
+                alpha = rng.uniform(0.1, 0.3)
+                bleed *= 1.0 - shift(spread, int(round(dy)), int(round(dx))) * alpha
+            noise = self.blotches(glyph.shape, rng)
+            stamps.append(keep_factor((1.0 - bleed) * noise + (1.0 - keep) * (1.0 - noise)))
+
+        return stamps
+
+    def blotches(self, shape, rng):
+        #Low frequency noise in [0.5, 1], a few pixels per cell at any DPI
+        cell = max(1, int(round(self.effect_scale)))
+        coarse = rng.uniform(0.5, 1.0, (shape[0] // cell + 1, shape[1] // cell + 1))
+        noise = np.repeat(np.repeat(coarse, cell, axis=0), cell, axis=1)
+        return box_blur(noise[:shape[0], :shape[1]].astype(np.float32), 1)
+
+    def make_splatters(self):
+        #Dot patterns around an origin at the window center
+        rng = np.random.default_rng([self.seed])
+        scale = self.effect_scale
+        reach = int(math.ceil(8 * scale)) + 1
+        yy, xx = np.ogrid[-reach:reach + 1, -reach:reach + 1]
+        patterns = []
+        for _ in range(SPLATTER_VARIANTS):
+            keep = np.ones((2 * reach + 1, 2 * reach + 1), dtype=np.float32)
+            for _ in range(rng.integers(3, MAX_SPLATTER_DOTS + 1)):
+                cx, cy = np.clip(rng.normal(0, 2, 2) * scale, -6 * scale, 6 * scale)
+                radius = rng.uniform(0.5, 2) * scale / 2
+                alpha = rng.uniform(0.1, 0.4)
+                disc = (yy - cy) ** 2 + (xx - cx) ** 2 <= radius * radius + 0.25
+                keep[disc] *= 1.0 - alpha
+            patterns.append(keep_factor(1.0 - keep))
+        return reach, patterns
+
+    def queue(self, char, x, y):
+        #Remember a glyph drawn with its baseline start at (x, y), the effects
+        #take their strength from the ink already on the page
+        if not char.isspace():
+            self.pending.append((char, int(x), int(y)))
+
+    def apply(self, page, index):
+        if not self.pending:
+            return
+        rng = np.random.default_rng([self.seed, index])
+        arr = page_array(page)
+        ascent = self.metrics.ascent()
+        reach, splatters = self.splatters
+
+        count = len(self.pending)
+        bleeds = rng.random(count) < BLEED_PROB
+        variants = rng.integers(1, BLEED_VARIANTS + 1, count) * bleeds
+        splattered = rng.random(count) < SPLATTER_PROB
+        patterns = rng.integers(0, SPLATTER_VARIANTS, count)
+
+        for i, (char, x, y) in enumerate(self.pending):
+            stamps = self.stamps.get(char)
+            if stamps is None:
+                stamps = self.stamps[char] = self.make_stamps(char)
+            darken(arr, x - self.pad, y - ascent - self.pad, stamps[variants[i]])
+            if splattered[i]:
+                darken(arr, x - reach, y - reach, splatters[patterns[i]])
+
+        self.pending = []
+
+
+class RibbonWear:
+    #Variable ink fade from a worn ribbon: density drifts smoothly from line to
+    #line and page to page, and now and then a glyph loses the top or bottom half
+    #of its ink. Applied once per page as an intensity modulation of the drawn ink
+
+    #Lines per full swing of the ribbon density and how deep the swing goes
+    PERIOD = 37
+    DEPTH = 0.25
+    #Pages per full swing of the overall ribbon level, and how deep it goes
+    PAGE_PERIOD = 11
+    PAGE_DEPTH = 0.2
+    #Density across the carriage travel
+    ACROSS = 0.08
+    #Share of glyph cells hitting a dry half of the ribbon, and the ink they keep
+    DROPOUT_PROB = 0.01
+    DROPOUT_DENSITY = 0.35
+
+    def __init__(self, font, left, width, effect_scale, seed):
+        metrics = QFontMetrics(font)
+        self.ascent = metrics.ascent()
+        self.cell_width = max(1, metrics.horizontalAdvance('M'))
+        self.pad = int(math.ceil(effect_scale / 2))
+        self.height = metrics.height() + 2 * self.pad
+        self.left = left
+        self.width = width
+        self.seed = seed
+        rng = np.random.default_rng([seed])
+        self.phase = rng.uniform(0, 2 * np.pi)
+        self.page_phase = rng.uniform(0, 2 * np.pi)
+        self.pending = []
+
+        #Slight density change across the line as the ribbon feeds
+        x = np.arange(width) / max(1, width)
+        phase = rng.uniform(0, 2 * np.pi)
+        self.across = 1.0 - self.ACROSS * (0.5 + 0.5 * np.sin(2 * np.pi * x + phase))
+
+    def queue_line(self, y):
+        #Remember a line of text drawn with its top at y
+        self.pending.append(int(y))
+
+    def apply(self, page, index, line_offset):
+        #index is the page number and line_offset the number of lines before it,
+        #so pages can be faded in any order and still continue each other
+        lines = self.pending
+        self.pending = []
+        if not lines:
+            return
+
+        rng = np.random.default_rng([self.seed, index])
+        arr = page_array(page)
+        page_height = arr.shape[0]
+
+        #Ribbon level wanders slowly from page to page
+        level = 1.0 - self.PAGE_DEPTH * (0.5 + 0.5 * np.sin(2 * np.pi * index / self.PAGE_PERIOD + self.page_phase))
+
+        #Smooth density per line, continuing across pages
+        line = line_offset + np.arange(len(lines))
+        swing = 0.5 + 0.5 * np.sin(2 * np.pi * line / self.PERIOD + self.phase)
+        density = level * (1.0 - self.DEPTH * swing)
+
+        #Per line, half and column density, with dry top or bottom halves of some glyph cells
+        keep = density[:, None, None] * self.across[None, None, :]
+        keep = np.repeat(keep, 2, axis=1)
+        cells = self.width // self.cell_width
+        line, cell = np.nonzero(rng.random((len(lines), cells)) < self.DROPOUT_PROB)
+        half = rng.integers(0, 2, len(line))
+        columns = cell[:, None] * self.cell_width + np.arange(self.cell_width)
+        keep[line[:, None], half[:, None], columns] *= self.DROPOUT_DENSITY
+        keep = np.round(keep * 256).astype(np.uint32)
+
+        cols = slice(self.left, self.left + self.width)
+        for i, y in enumerate(lines):
+            top = max(0, y - self.pad)
+            bottom = min(page_height, y - self.pad + self.height)
+            split = min(max(y + self.ascent // 2, top), bottom)
+            scale_ink(arr[top:split, cols], keep[i, 0])
+            scale_ink(arr[split:bottom, cols], keep[i, 1])
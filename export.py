@@ -0,0 +1,523 @@
+import io
+import os
+import zlib
+import shutil
+import hashlib
+from dataclasses import dataclass, field, replace, astuple
+
+import numpy as np
+from PyQt6.QtCore import Qt
+
+from effects import page_view
+from render import PAPER_SIZES
+
+
+@dataclass
+class ExportProfile:
+    #How exported pages are encoded: 'rgb', 'gray' or 'bitonal' pixels,
+    #compressed with 'flate', 'jpeg' or 'g4' (CCITT Group 4, bitonal only),
+    #optionally downsampled to dpi first
+    mode: str = 'rgb'
+    compression: str = 'flate'
+    quality: int = 85  #JPEG only
+    dpi: int = None
+
+
+EXPORT_PROFILES = {
+    'color': ExportProfile(),
+    'gray': ExportProfile('gray', 'flate'),
+    'bitonal': ExportProfile('bitonal', 'g4'),
+    'jpeg': ExportProfile('gray', 'jpeg')
+}
+
+#PIL names of the compressions, for TIFF output
+TIFF_COMPRESSIONS = {'flate': 'tiff_adobe_deflate', 'jpeg': 'jpeg', 'g4': 'group4'}
+
+
+def get_profile(name='color', quality=None, dpi=None):
+    if name not in EXPORT_PROFILES:
+        raise ValueError(f"Unknown export profile: {name}")
+    profile = EXPORT_PROFILES[name]
+    if quality is not None:
+        profile = replace(profile, quality=quality)
+    if dpi:
+        profile = replace(profile, dpi=dpi)
+    return profile
+
+
+def page_pixels(page, profile, dpi):
+    #Downsample to the profile's DPI, then read the page in its pixel mode:
+    #RGB rows, or a single gray plane. This is the only copy of the full
+    #page made on export, the encoders work from it. It is a copy and not a
+    #view, a downsampled page is freed when this returns
+    if profile.dpi and profile.dpi < dpi:
+        page = page.scaled(
+            max(1, round(page.width() * profile.dpi / dpi)),
+            max(1, round(page.height() * profile.dpi / dpi)),
+            Qt.AspectRatioMode.IgnoreAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+    channels = page_view(page).view(np.uint8).reshape(page.height(), page.width(), 4)
+    if profile.mode == 'rgb':
+        return np.ascontiguousarray(channels[..., 2::-1])
+    #Typed pages are gray, any channel carries the ink
+    return np.ascontiguousarray(channels[..., 0])
+
+
+def pixels_image(pixels, profile):
+    from PIL import Image
+
+    image = Image.fromarray(pixels)
+    if profile.mode == 'bitonal':
+        #Floyd-Steinberg dithering keeps faint ink and the ribbon texture
+        image = image.convert('1')
+    return image
+
+
+def g4_bytes(image):
+    #CCITT Group 4 data of a bitonal image: written as a single strip TIFF
+    #and taken out of it, so no encoder of our own is needed
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'TIFF', compression='group4', tiffinfo={278: image.height})
+    buffer.seek(0)
+    tiff = Image.open(buffer)
+    offset, = tiff.tag_v2[273]
+    length, = tiff.tag_v2[279]
+    return buffer.getvalue()[offset:offset + length]
+
+
+@dataclass
+class PdfRevision:
+    #Object layout of a PDF as PdfPageWriter left it, enough to append an
+    #incremental update that replaces or adds pages
+    page_ids: list = field(default_factory=list)
+    image_ids: list = field(default_factory=list)
+    image_sizes: list = field(default_factory=list)  #bytes of each page's image stream
+    next_id: int = 3  #1 is the catalog, 2 the page tree
+    xref_offset: int = 0
+    size: int = 0
+    garbage: int = 0  #bytes of objects earlier updates replaced or dropped
+
+
+class PdfPageWriter:
+    #Writes a PDF one page at a time, so a document never has to be held in
+    #memory: every page image is flushed to disk as soon as it is added.
+    #Given the revision of a PDF it wrote before, appends an incremental
+    #update to it instead: replaced page images reuse their object numbers,
+    #and only the new objects get an xref section pointing back at the old one
+
+    def __init__(self, file_name, settings, profile=None, previous=None):
+        width_mm, height_mm = PAPER_SIZES[settings.paper_size]
+        self.page_size = (width_mm * 72 / 25.4, height_mm * 72 / 25.4)  #points
+        self.dpi = settings.dpi
+        self.profile = profile or get_profile()
+        self.file_name = file_name
+        self.previous = previous
+        self.offsets = {}
+        if previous is None:
+            self.revision = PdfRevision()
+            self.file = open(file_name, 'wb')
+            self.file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        else:
+            self.revision = replace(
+                previous,
+                page_ids=list(previous.page_ids),
+                image_ids=list(previous.image_ids),
+                image_sizes=list(previous.image_sizes)
+            )
+            self.file = open(file_name, 'ab')
+
+    @property
+    def page_ids(self):
+        return self.revision.page_ids
+
+    @property
+    def next_id(self):
+        return self.revision.next_id
+
+    @property
+    def page_count(self):
+        return len(self.page_ids)
+
+    def allocate(self):
+        obj_id = self.revision.next_id
+        self.revision.next_id += 1
+        return obj_id
+
+    def write_object(self, obj_id, dictionary, stream=None):
+        self.offsets[obj_id] = self.file.tell()
+        self.file.write(b'%d 0 obj\n' % obj_id)
+        if stream is None:
+            self.file.write(b'<< %s >>\nendobj\n' % dictionary)
+        else:
+            self.file.write(b'<< %s /Length %d >>\nstream\n' % (dictionary, len(stream)))
+            self.file.write(stream)
+            self.file.write(b'\nendstream\nendobj\n')
+
+    def add_page(self, page):
+        width, height = self.page_size
+        #Object numbers only once the image is encoded, a page that fails
+        #leaves no numbers behind without an object
+        dictionary, stream = self.encode_image(page)
+        image_id, content_id, page_id = self.allocate(), self.allocate(), self.allocate()
+        self.write_object(image_id, dictionary, stream)
+        self.write_object(content_id, b'', b'q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q' % (width, height))
+        self.write_object(
+            page_id,
+            b'/Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] '
+            b'/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R'
+            % (width, height, image_id, content_id)
+        )
+        self.revision.page_ids.append(page_id)
+        self.revision.image_ids.append(image_id)
+        self.revision.image_sizes.append(len(stream))
+
+    def replace_page(self, index, page):
+        #New image for a page, under the old image's object number
+        revision = self.revision
+        dictionary, stream = self.encode_image(page)
+        self.write_object(revision.image_ids[index], dictionary, stream)
+        revision.garbage += revision.image_sizes[index]
+        revision.image_sizes[index] = len(stream)
+
+    def truncate(self, count):
+        #Drop pages past count from the document
+        revision = self.revision
+        revision.garbage += sum(revision.image_sizes[count:])
+        del revision.page_ids[count:], revision.image_ids[count:], revision.image_sizes[count:]
+
+    def encode_image(self, page):
+        #Image XObject dictionary and stream of a page in the export profile
+        profile = self.profile
+        pixels = page_pixels(page, profile, self.dpi)
+        height, width = pixels.shape[:2]
+        colorspace = b'/DeviceRGB' if profile.mode == 'rgb' else b'/DeviceGray'
+        bits = 1 if profile.mode == 'bitonal' else 8
+
+        if profile.compression == 'g4':
+            stream = g4_bytes(pixels_image(pixels, profile))
+            filters = b'/Filter /CCITTFaxDecode /DecodeParms << /K -1 /Columns %d /Rows %d /BlackIs1 true >>' % (width, height)
+        elif profile.compression == 'jpeg':
+            buffer = io.BytesIO()
+            pixels_image(pixels, profile).save(buffer, 'JPEG', quality=profile.quality)
+            stream = buffer.getvalue()
+            filters = b'/Filter /DCTDecode'
+        elif profile.mode == 'bitonal':
+            stream = zlib.compress(np.packbits(np.asarray(pixels_image(pixels, profile)), axis=1).tobytes(), 6)
+            filters = b'/Filter /FlateDecode'
+        else:
+            stream = zlib.compress(pixels, 6)
+            filters = b'/Filter /FlateDecode'
+
+        dictionary = (
+            b'/Type /XObject /Subtype /Image /Width %d /Height %d '
+            b'/ColorSpace %s /BitsPerComponent %d %s'
+            % (width, height, colorspace, bits, filters)
+        )
+        return dictionary, stream
+
+    def close(self):
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        self.write_object(2, b'/Type /Pages /Kids [%s] /Count %d' % (kids, len(self.page_ids)))
+
+        if self.previous is None:
+            self.write_object(1, b'/Type /Catalog /Pages 2 0 R')
+            xref_offset = self.file.tell()
+            self.file.write(b'xref\n0 %d\n0000000000 65535 f \n' % self.next_id)
+            for obj_id in range(1, self.next_id):
+                self.file.write(b'%010d 00000 n \n' % self.offsets[obj_id])
+            trailer = b'/Size %d /Root 1 0 R' % self.next_id
+        else:
+            #Only the objects of this update, in runs of consecutive numbers
+            xref_offset = self.file.tell()
+            self.file.write(b'xref\n')
+            obj_ids = sorted(self.offsets)
+            start = 0
+            for end in range(1, len(obj_ids) + 1):
+                if end == len(obj_ids) or obj_ids[end] != obj_ids[end - 1] + 1:
+                    self.file.write(b'%d %d\n' % (obj_ids[start], end - start))
+                    for obj_id in obj_ids[start:end]:
+                        self.file.write(b'%010d 00000 n \n' % self.offsets[obj_id])
+                    start = end
+            trailer = b'/Size %d /Root 1 0 R /Prev %d' % (self.next_id, self.previous.xref_offset)
+
+        self.file.write(b'trailer\n<< %s >>\nstartxref\n%d\n%%%%EOF\n' % (trailer, xref_offset))
+        self.revision.xref_offset = xref_offset
+        self.revision.size = self.file.tell()
+        self.file.close()
+
+    def abort(self):
+        #Stop without a trailer. An update is cut off again, which leaves the
+        #previous revision exactly as it was
+        if self.previous is not None:
+            self.file.truncate(self.previous.size)
+        self.file.close()
+
+
+class PngPageWriter:
+    #Saves every page as its own numbered PNG next to the given file name,
+    #or JPEG under the jpeg profile since PNG has no lossy compression
+
+    def __init__(self, file_name, settings, profile=None):
+        self.base = os.path.splitext(file_name)[0]
+        self.dpi = settings.dpi
+        self.profile = profile or get_profile()
+        self.files = []
+
+    @property
+    def page_count(self):
+        return len(self.files)
+
+    def page_file(self, index):
+        extension = 'jpg' if self.profile.compression == 'jpeg' else 'png'
+        return f"{self.base}_page_{index + 1}.{extension}"
+
+    def add_page(self, page):
+        self.files.append(self.page_file(len(self.files)))
+        self.replace_page(len(self.files) - 1, page)
+
+    def replace_page(self, index, page):
+        #Saved aside and renamed over the page's file, which is never half written
+        profile = self.profile
+        page_file = self.page_file(index)
+        saving = temp_path(page_file)
+        try:
+            if profile == EXPORT_PROFILES['color']:
+                if not page.save(saving):
+                    raise OSError(f"Could not write {saving}")
+            else:
+                dpi = profile.dpi or self.dpi
+                image = pixels_image(page_pixels(page, profile, self.dpi), profile)
+                image.save(saving, quality=profile.quality, dpi=(dpi, dpi))
+        except BaseException:
+            if os.path.exists(saving):
+                os.remove(saving)
+            raise
+        os.replace(saving, page_file)
+
+    def truncate(self, count):
+        for page_file in self.files[count:]:
+            if os.path.exists(page_file):
+                os.remove(page_file)
+        del self.files[count:]
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+class TiffPageWriter:
+    #Writes a multi-page TIFF one page at a time
+
+    def __init__(self, file_name, settings, profile=None):
+        from PIL import TiffImagePlugin
+
+        self.dpi = settings.dpi
+        self.profile = profile or get_profile()
+        self.file = open(file_name, 'w+b')
+        self.tiff = TiffImagePlugin.AppendingTiffWriter(self.file, new=True)
+        self.count = 0
+
+    @property
+    def page_count(self):
+        return self.count
+
+    def add_page(self, page):
+        profile = self.profile
+        dpi = profile.dpi or self.dpi
+        image = pixels_image(page_pixels(page, profile, self.dpi), profile)
+        options = {'quality': profile.quality} if profile.compression == 'jpeg' else {}
+        image.save(
+            self.tiff, 'TIFF',
+            compression=TIFF_COMPRESSIONS[profile.compression],
+            dpi=(dpi, dpi),
+            **options
+        )
+        self.tiff.newFrame()
+        self.count += 1
+
+    def close(self):
+        self.tiff.close()
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+def open_page_writer(file_name, settings, profile=None):
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == '.png':
+        return PngPageWriter(file_name, settings, profile)
+    if extension in ('.tif', '.tiff'):
+        return TiffPageWriter(file_name, settings, profile)
+    return PdfPageWriter(file_name, settings, profile)
+
+
+def file_stamp(file_name):
+    try:
+        stat = os.stat(file_name)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def content_hash(page, key=None):
+    #Hash of what a page shows: of its render key when the caller has one,
+    #which is much cheaper, otherwise of the pixels
+    if key is not None:
+        return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+    pixels = page.constBits()
+    pixels.setsize(page.sizeInBytes())
+    return hashlib.blake2b(pixels, digest_size=16).digest()
+
+
+@dataclass
+class ExportRecord:
+    #What the last export wrote, to tell which pages changed since
+    file_name: str
+    options: tuple  #Settings and profile, any change means a full export
+    hashes: list
+    files: list
+    stamps: list  #mtime and size of the files, edits from outside mean a full export
+    revision: PdfRevision = None
+
+
+class IncrementalExport:
+    #Exports a document again to the file it went to last time, encoding only
+    #the pages whose content hash changed since. PDFs get an incremental
+    #update appended, PNG sets have just the changed page files rewritten.
+    #Anything else, or a file changed by someone else, is exported in full.
+    #A failed update leaves the previous export as it was
+
+    #Compact a PDF with a full export once replaced pages make up this share of it
+    MAX_GARBAGE = 0.5
+
+    def __init__(self):
+        self.last = None
+
+    def export(self, file_name, pages, settings, profile=None, keys=None, atomic=False):
+        #Returns the number of pages encoded. keys are optional per page
+        #render keys that stand in for hashing the pixels. With atomic, a
+        #full export is written aside and renamed over the old files
+        profile = profile or get_profile()
+        options = (astuple(settings), astuple(profile))
+        load = getattr(pages, 'load', pages.__getitem__)
+        hashes = [content_hash(None if keys else load(index), keys[index] if keys else None)
+                  for index in range(len(pages))]
+
+        last = self.last
+        self.last = None  #Forgotten until the file is complete again
+        if (last is None or last.file_name != file_name or last.options != options
+                or last.stamps != [file_stamp(name) for name in last.files]):
+            last = None
+        elif last.revision is not None and last.revision.garbage > self.MAX_GARBAGE * last.revision.size:
+            last = None
+
+        extension = os.path.splitext(file_name)[1].lower()
+        if last is None or extension not in ('.png', '.pdf'):
+            write = write_atomic if atomic else write_pages
+            files, revision = write(file_name, (load(index) for index in range(len(pages))), settings, profile)
+            self.remember(file_name, options, hashes, files, revision)
+            return len(pages)
+
+        changed = [index for index in range(len(pages))
+                   if index >= len(last.hashes) or hashes[index] != last.hashes[index]]
+        target = file_name
+        if extension == '.png':
+            #Every page file is replaced by renaming on its own
+            writer = PngPageWriter(file_name, settings, profile)
+            writer.files = list(last.files)
+        elif atomic:
+            #The update goes onto a copy that is renamed over the output
+            target = temp_path(file_name)
+
+        #Whatever stops the update, Ctrl+C included, leaves no copy behind
+        try:
+            if extension == '.pdf':
+                if target != file_name:
+                    shutil.copyfile(file_name, target)
+                writer = PdfPageWriter(target, settings, profile, last.revision)
+            try:
+                writer.truncate(len(pages))
+                for index in changed:
+                    if index < writer.page_count:
+                        writer.replace_page(index, load(index))
+                    else:
+                        writer.add_page(load(index))
+            except BaseException:
+                writer.abort()
+                raise
+            writer.close()
+            if target != file_name:
+                os.replace(target, file_name)
+        finally:
+            if target != file_name and os.path.exists(target):
+                os.remove(target)
+
+        self.remember(file_name, options, hashes, getattr(writer, 'files', [file_name]),
+                      getattr(writer, 'revision', None))
+        return len(changed)
+
+    def remember(self, file_name, options, hashes, files, revision):
+        stamps = [file_stamp(name) for name in files]
+        self.last = ExportRecord(file_name, options, hashes, files, stamps, revision)
+
+
+def write_pages(file_name, pages, settings, profile=None):
+    #Returns the files written and, for a PDF, its revision
+    writer = open_page_writer(file_name, settings, profile)
+    try:
+        for page in pages:
+            writer.add_page(page)
+    finally:
+        writer.close()
+    return getattr(writer, 'files', [file_name]), getattr(writer, 'revision', None)
+
+
+def temp_path(file_name):
+    #Hidden name next to file_name with the same extension, renaming from it
+    #to file_name is atomic
+    directory, name = os.path.split(os.path.abspath(file_name))
+    base, extension = os.path.splitext(name)
+    return os.path.join(directory, f".{base}.{os.getpid()}.tmp{extension}")
+
+
+def write_atomic(file_name, pages, settings, profile=None):
+    #write_pages to a hidden file next to file_name renamed into place, so
+    #readers only ever see a complete file. Image sets are renamed page by
+    #page and pages the document no longer has are removed
+    extension = os.path.splitext(file_name)[1]
+    temp_base = temp_path(file_name)[:-len(extension) or None]
+    writer = open_page_writer(temp_base + extension, settings, profile)
+    #Whatever stops the export, Ctrl+C included, leaves no hidden files behind
+    try:
+        try:
+            for page in pages:
+                writer.add_page(page)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+
+        temp_files = getattr(writer, 'files', None)
+        if temp_files is None:
+            os.replace(temp_base + extension, file_name)
+            return [file_name], getattr(writer, 'revision', None)
+        output_base = os.path.splitext(file_name)[0]
+        files = [output_base + temp_name[len(temp_base):] for temp_name in temp_files]
+        for temp_name, page_file in zip(temp_files, files):
+            os.replace(temp_name, page_file)
+    finally:
+        for temp_name in getattr(writer, 'files', [temp_base + extension]):
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+    stale = PngPageWriter(file_name, settings, profile)
+    number = len(files)
+    while os.path.exists(stale.page_file(number)):
+        os.remove(stale.page_file(number))
+        number += 1
+    return files, None
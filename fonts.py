@@ -0,0 +1,89 @@
+from PyQt6.QtGui import QFont, QFontDatabase, QFontMetrics, QRawFont
+
+
+#Family drawing each codepoint the primary fonts lack, None when no installed
+#family has it. Shared by every font set, coverage does not depend on size
+fallback_families = {}
+#Families that covered earlier codepoints, tried first for the next one
+recent_families = []
+#Per family raw font used to check coverage, loaded once
+raw_fonts = {}
+
+
+def raw_font(family):
+    raw = raw_fonts.get(family)
+    if raw is None:
+        font = QFont(family)
+        font.setStyleStrategy(QFont.StyleStrategy.NoFontMerging)
+        raw = raw_fonts[family] = QRawFont.fromFont(font)
+    return raw
+
+
+def find_fallback(codepoint):
+    #Families that already helped out first, then monospaced ones so the
+    #text keeps its typewriter look, then everything else
+    if codepoint in fallback_families:
+        return fallback_families[codepoint]
+    families = QFontDatabase.families()
+    fixed = [family for family in families if QFontDatabase.isFixedPitch(family)]
+    candidates = dict.fromkeys(recent_families + fixed + families)
+    found = None
+    for family in candidates:
+        if raw_font(family).supportsCharacter(codepoint):
+            found = family
+            break
+    if found is not None:
+        if found in recent_families:
+            recent_families.remove(found)
+        recent_families.insert(0, found)
+    fallback_families[codepoint] = found
+    return found
+
+
+class FontSet:
+    #The primary typewriter font plus the fallbacks the text needs. Each
+    #distinct character is checked against the primary font once; characters
+    #it lacks are mapped to a fallback font drawn without Qt's own per call
+    #fallback resolution, with that font's advance. Lines keep the primary
+    #font's ascent so mixed scripts share a baseline
+
+    def __init__(self, font):
+        self.font = font
+        self.metrics = QFontMetrics(font)
+        self.raw = QRawFont.fromFont(font)
+        self.fallbacks = {}  #family: font at the primary font's size
+        self.glyphs = {}  #char: (font, advance)
+        self.widths = {}  #word: advance
+
+    def glyph(self, char):
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            glyph = self.glyphs[char] = self.resolve(char)
+        return glyph
+
+    def resolve(self, char):
+        codepoint = ord(char)
+        family = None
+        if not char.isspace() and not self.raw.supportsCharacter(codepoint):
+            family = find_fallback(codepoint)
+        if family is None:
+            #Covered, or nothing installed covers it and Qt gets its say
+            return (self.font, self.metrics.horizontalAdvance(char))
+        font = self.fallbacks.get(family)
+        if font is None:
+            font = self.fallbacks[family] = QFont(self.font)
+            font.setFamily(family)
+            font.setStyleStrategy(QFont.StyleStrategy.NoFontMerging)
+        return (font, QFontMetrics(font).horizontalAdvance(char))
+
+    def font_for(self, char):
+        return self.glyph(char)[0]
+
+    def advance(self, char):
+        return self.glyph(char)[1]
+
+    def text_advance(self, text):
+        width = self.widths.get(text)
+        if width is None:
+            width = self.widths[text] = sum(self.glyph(char)[1] for char in text)
+        return width
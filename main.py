@@ -1,11 +1,116 @@
 # main.py
 
+import os
 import sys
+import signal
+import argparse
 from PyQt6.QtWidgets import QApplication, QStyleFactory
-from PyQt6.QtGui import QFont, QColor
-from ui import TypewriterConverter
+from PyQt6.QtGui import QFont, QColor, QGuiApplication
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="typy - A typewriter simulator by VX Software")
+    parser.add_argument('input', nargs='?',
+                        help="text file or .typy project to render without opening the window")
+    parser.add_argument('-o', '--output',
+                        help="output file: .pdf, .tif, or .png for one image per page")
+    parser.add_argument('--settings',
+                        help=".typy project to take the paper and typewriter settings from")
+    parser.add_argument('--profile', default='color',
+                        choices=('color', 'gray', 'bitonal', 'jpeg'),
+                        help="export profile: RGB, 8-bit gray, 1-bit CCITT G4 or gray JPEG")
+    parser.add_argument('--quality', type=int,
+                        help="JPEG quality of the jpeg profile")
+    parser.add_argument('--export-dpi', type=int,
+                        help="downsample exported pages to this DPI")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep rendering the input to the output whenever it or the settings change")
+    parser.add_argument('--serve', action='store_true',
+                        help="run as a render service reading JSON-lines jobs from stdin")
+    parser.add_argument('--socket',
+                        help="run as a render service listening on this Unix socket")
+    parser.add_argument('--workers', type=int,
+                        help="render service worker processes, one per CPU by default")
+    return parser.parse_args(argv)
+
+
+def render_headless(args):
+    from render import RenderSettings, PageRenderer, read_lines
+    from export import open_page_writer, get_profile
+    from project import read_project
+
+    #No window is shown, so no display is needed either
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QGuiApplication(sys.argv[:1])
+
+    settings = RenderSettings()
+    if args.settings:
+        settings = RenderSettings.from_project(read_project(args.settings))
+
+    if args.input.endswith('.typy'):
+        project_data = read_project(args.input)
+        if not args.settings:
+            settings = RenderSettings.from_project(project_data)
+        lines = project_data['text'].split('\n')
+    else:
+        #Text files are streamed, pages are written as soon as they fill up
+        lines = read_lines(args.input)
+
+    output = args.output or os.path.splitext(args.input)[0] + '.pdf'
+    profile = get_profile(args.profile, args.quality, args.export_dpi)
+    writer = open_page_writer(output, settings, profile)
+    renderer = PageRenderer(settings)
+    try:
+        for page in renderer.render_pages(lines):
+            writer.add_page(page)
+    finally:
+        writer.close()
+
+    print(f"Saved {writer.page_count} pages to {output}")
+    return 0
+
+
+def watch(args):
+    from watch import DocumentWatcher
+    from export import get_profile
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QGuiApplication(sys.argv[:1])
+
+    output = args.output or os.path.splitext(args.input)[0] + '.pdf'
+    profile = get_profile(args.profile, args.quality, args.export_dpi)
+    watcher = DocumentWatcher(args.input, output, args.settings, profile)
+    #Stopping the watcher unwinds like Ctrl+C, so no half written temp file stays
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def serve(args):
+    from service import RenderService
+
+    service = RenderService(args.workers)
+    if args.socket:
+        service.serve_socket(args.socket)
+    else:
+        service.serve_stdin()
+    return 0
+
 
 def main():
+    args = parse_args(sys.argv[1:])
+    if args.serve or args.socket:
+        sys.exit(serve(args))
+    if args.input and args.watch:
+        sys.exit(watch(args))
+    if args.input:
+        sys.exit(render_headless(args))
+
+    from ui import TypewriterConverter
+
     app = QApplication(sys.argv)
     app.setStyle(QStyleFactory.create('Fusion'))
 
@@ -0,0 +1,166 @@
+import mmap
+import tempfile
+import zlib
+from collections import OrderedDict
+
+from PyQt6.QtGui import QImage
+
+
+#Memory the preview may spend on page images unless configured otherwise
+DEFAULT_BUDGET = 512 * 1024 * 1024  #bytes
+#Part of the budget compressed pages may use before they are spilled to disk
+PACKED_SHARE = 0.25
+#Fast compression, pages are mostly white paper and shrink well regardless
+PACK_LEVEL = 1
+
+PAGE_FORMAT = QImage.Format.Format_RGB32
+
+
+class PageStore:
+    #List of page images kept within a memory budget. The most recently
+    #viewed pages stay as images; older ones are compressed in memory and,
+    #when those pile up too, spilled to a memory-mapped scratch file.
+    #Entries are None (not rendered yet), a QImage or (data, width, height)
+    #where data is the compressed page, either bytes or a view of the
+    #mapped scratch file that is decompressed straight out of the mapping
+
+    def __init__(self, pages=(), budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.entries = []
+        self.hot = OrderedDict()  #index: bytes, oldest first
+        self.packed = OrderedDict()  #index: compressed bytes in memory, oldest first
+        self.hot_bytes = 0
+        self.packed_bytes = 0
+        self.scratch = None
+        self.mapping = None
+        self.scratch_end = 0
+        self.slots = {}  #index: (offset, size) in the scratch file
+        self.extend(pages)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        #Walk the pages without disturbing which ones are kept hot, so an
+        #export does not push the pages being viewed out of memory
+        for index in range(len(self.entries)):
+            yield self.load(index)
+
+    def __getitem__(self, index):
+        index = range(len(self.entries))[index]
+        image = self.load(index)
+        if image is not None and index in self.packed:
+            #Viewed again, keep it decompressed
+            self.unpack(index)
+            self.keep(index, image)
+        elif index in self.hot:
+            self.hot.move_to_end(index)
+        return image
+
+    def __setitem__(self, index, image):
+        index = range(len(self.entries))[index]
+        self.discard(index)
+        if image is None:
+            self.entries[index] = None
+            return
+        if image.format() != PAGE_FORMAT:
+            image = image.convertToFormat(PAGE_FORMAT)
+        self.keep(index, image)
+
+    def append(self, image):
+        self.entries.append(None)
+        self[len(self.entries) - 1] = image
+
+    def extend(self, images):
+        for image in images:
+            self.append(image)
+
+    def resize(self, count):
+        #Drop pages past count, or pad with pages not rendered yet
+        while len(self.entries) > count:
+            self.discard(len(self.entries) - 1)
+            self.entries.pop()
+        self.entries.extend([None] * (count - len(self.entries)))
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self.enforce()
+
+    def size(self, index):
+        #Page dimensions without loading it, None while it is not rendered
+        entry = self.entries[index]
+        if entry is None:
+            return None
+        if isinstance(entry, QImage):
+            return (entry.width(), entry.height())
+        return entry[1:]
+
+    def memory_usage(self):
+        return self.hot_bytes + self.packed_bytes
+
+    def load(self, index):
+        entry = self.entries[index]
+        if entry is None or isinstance(entry, QImage):
+            return entry
+        #The image keeps the decompressed buffer alive and uses it in place
+        data, width, height = entry
+        return QImage(zlib.decompress(data), width, height, width * 4, PAGE_FORMAT)
+
+    def keep(self, index, image):
+        self.entries[index] = image
+        self.hot[index] = image.sizeInBytes()
+        self.hot_bytes += image.sizeInBytes()
+        self.enforce()
+
+    def discard(self, index):
+        if index in self.hot:
+            self.hot_bytes -= self.hot.pop(index)
+        self.unpack(index)
+
+    def unpack(self, index):
+        if index in self.packed:
+            self.packed_bytes -= self.packed.pop(index)
+
+    def enforce(self):
+        #Always keep the most recent page as an image, it is the one in view
+        while self.memory_usage() > self.budget and len(self.hot) > 1:
+            index, size = self.hot.popitem(last=False)
+            self.hot_bytes -= size
+            image = self.entries[index]
+            data = zlib.compress(image.constBits().asstring(size), PACK_LEVEL)
+            self.entries[index] = (data, image.width(), image.height())
+            self.packed[index] = len(data)
+            self.packed_bytes += len(data)
+
+        while self.packed and (self.packed_bytes > self.budget * PACKED_SHARE
+                               or self.memory_usage() > self.budget):
+            index, size = self.packed.popitem(last=False)
+            self.packed_bytes -= size
+            data, width, height = self.entries[index]
+            self.entries[index] = (self.spill(index, data), width, height)
+
+    def spill(self, index, data):
+        #Reuse the page's slot if it fits, otherwise append a new one
+        offset, size = self.slots.get(index, (0, 0))
+        if size < len(data):
+            offset, size = self.scratch_end, len(data)
+            self.scratch_end += size
+            self.slots[index] = (offset, size)
+            self.grow_scratch()
+        #Written through the file, so the mapping only takes up memory while
+        #a page is read back and the kernel may drop it again any time
+        self.scratch.seek(offset)
+        self.scratch.write(data)
+        self.scratch.flush()
+        return memoryview(self.mapping)[offset:offset + len(data)]
+
+    def grow_scratch(self):
+        if self.scratch is None:
+            self.scratch = tempfile.TemporaryFile(prefix='typy-pages-')
+        if self.mapping is not None and len(self.mapping) >= self.scratch_end:
+            return
+        #Grow by doubling so the file is remapped rarely. Pages spilled through
+        #an older mapping keep it alive, it still covers their part of the file
+        length = self.scratch_end if self.mapping is None else max(self.scratch_end, 2 * len(self.mapping))
+        self.scratch.truncate(length)
+        self.mapping = mmap.mmap(self.scratch.fileno(), length, access=mmap.ACCESS_READ)
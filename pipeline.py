@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from dataclasses import astuple
+
+from render import STAGES, PageRenderer
+from textindex import TextIndex
+
+PLACEMENT = STAGES.index('placement')
+EFFECTS = STAGES.index('effects')
+
+
+class RenderPipeline:
+    #Renders the editor text in stages and keeps every stage's output per
+    #page: layout, glyph placements and the glyph rasters before effects.
+    #Rasters are kept within a memory budget, least recently used first out;
+    #rasterizing a page again is cheaper than compressing and restoring it.
+    #An update diffs the new settings against the last snapshot and the new
+    #layout against the old one, and only redoes what either invalidated.
+    #Dragging an effects slider re-runs effects on the cached rasters,
+    #editing one page leaves the others alone
+
+    def __init__(self, seed, budget):
+        self.seed = seed
+        self.budget = budget
+        self.reset()
+
+    def reset(self):
+        self.settings = None
+        self.renderer = None
+        self.source_lines = None
+        self.layout = []  #(lines, line_offset) per page
+        self.text_index = None  #Text offsets to page positions and back
+        self.placements = []  #Glyph display list per page, None when invalid
+        self.rasters = OrderedDict()  #index: page before effects, oldest first
+        self.raster_bytes = 0
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self.trim_rasters()
+
+    def drop_raster(self, index):
+        raster = self.rasters.pop(index, None)
+        if raster is not None:
+            self.raster_bytes -= raster.sizeInBytes()
+
+    def keep_raster(self, index, raster):
+        self.rasters[index] = raster
+        self.raster_bytes += raster.sizeInBytes()
+        self.trim_rasters()
+
+    def trim_rasters(self):
+        while self.raster_bytes > self.budget and self.rasters:
+            self.drop_raster(next(iter(self.rasters)))
+
+    def page_count(self):
+        return len(self.layout)
+
+    def page_key(self, index):
+        #Pages with equal keys render identically
+        lines, line_offset = self.layout[index]
+        return (astuple(self.settings), self.seed, index, line_offset, tuple(lines))
+
+    def update(self, source_lines, settings):
+        #Take new text and settings, returns the pages whose output changed
+        stage = 0 if self.settings is None else settings.first_changed_stage(self.settings)
+        if stage == len(STAGES) and source_lines == self.source_lines:
+            return []
+        if stage < len(STAGES):
+            self.settings = settings
+            self.renderer = PageRenderer(settings, self.seed)
+
+        old_layout = self.layout
+        if stage == 0 or source_lines != self.source_lines:
+            self.layout = []
+            self.text_index = TextIndex(self.renderer.fonts, self.renderer.margin_pixels, source_lines)
+            offsets = []
+            line_offset = 0
+            for lines in self.renderer.layout(source_lines, offsets):
+                self.layout.append((lines, line_offset))
+                self.text_index.add_page(lines, offsets[line_offset:line_offset + len(lines)])
+                line_offset += len(lines)
+        self.source_lines = source_lines
+
+        count = len(self.layout)
+        self.placements[count:] = []
+        self.placements.extend([None] * (count - len(self.placements)))
+        for index in [index for index in self.rasters if index >= count]:
+            self.drop_raster(index)
+
+        dirty = []
+        for index in range(count):
+            moved = index >= len(old_layout) or old_layout[index] != self.layout[index]
+            if moved or stage <= PLACEMENT:
+                #Rasters follow the placements, no setting of their own
+                self.placements[index] = None
+                self.drop_raster(index)
+            if moved or stage <= EFFECTS:
+                dirty.append(index)
+        return dirty
+
+    def render(self, index, draft=False):
+        #Run the stages a page is missing, effects always run on a copy of
+        #the cached raster. A draft shares the placements, so glyphs sit
+        #where the full render puts them, but is drawn aliased, skips the
+        #effects and is not cached
+        lines, line_offset = self.layout[index]
+        glyphs = self.placements[index]
+        if glyphs is None:
+            glyphs = self.placements[index] = self.renderer.place(lines, index, line_offset)
+        if draft:
+            return self.renderer.rasterize(glyphs, draft=True)
+        raster = self.rasters.get(index)
+        if raster is None:
+            raster = self.renderer.rasterize(glyphs)
+            self.keep_raster(index, raster)
+        else:
+            self.rasters.move_to_end(index)
+        page = raster.copy()
+        effects = self.renderer.effect_ops(lines, glyphs, index, line_offset)
+        self.renderer.apply_effects(page, effects)
+        return page
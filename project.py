@@ -0,0 +1,33 @@
+import json
+import base64
+
+from PyQt6.QtCore import QByteArray, QBuffer
+from PyQt6.QtGui import QImage
+
+
+def encode_page(page):
+    #Rendered pages are stored as base64 encoded PNG
+    byte_array = QByteArray()
+    buffer = QBuffer(byte_array)
+    buffer.open(QBuffer.OpenModeFlag.WriteOnly)
+    page.save(buffer, "PNG")
+    return base64.b64encode(byte_array.data()).decode()
+
+
+def decode_page(page_data):
+    #Convert base64 back to QImage
+    byte_array = QByteArray.fromBase64(page_data.encode())
+    image = QImage()
+    image.loadFromData(byte_array, "PNG")
+    return image
+
+
+def write_project(file_name, project_data, pages):
+    project_data['pages'] = [encode_page(page) for page in pages]
+    with open(file_name, 'w') as f:
+        json.dump(project_data, f)
+
+
+def read_project(file_name):
+    with open(file_name, 'r') as f:
+        return json.load(f)
@@ -0,0 +1,399 @@
+import random
+from dataclasses import dataclass, asdict, fields
+
+from PyQt6.QtGui import QFont, QPainter, QColor, QImage, QPen
+from PyQt6.QtCore import Qt
+
+from fonts import FontSet
+from displaylist import DisplayList, GLYPH, INK, DOT, STAMP, RIBBON
+
+
+PAGE_BREAK_MARKER = '!pb'
+
+PAPER_SIZES = {
+    "a4": (210, 297),  #mm
+    "letter": (216, 279),
+    "a5": (148, 210),
+    "b5": (176, 250),
+    "legal": (216, 356),
+    "a3": (297, 420)
+}
+
+#Bytes read from a manuscript at a time when streaming it
+CHUNK_SIZE = 1 << 16
+
+PAPER_KEYS = ('paper_size', 'dpi', 'margin')
+
+#Render stages in order and the settings each one reads. A stage also
+#depends on every stage before it; rasterization only on the placements
+STAGES = ('layout', 'placement', 'raster', 'effects')
+STAGE_SETTINGS = {
+    'layout': ('paper_size', 'dpi', 'margin', 'font_size'),
+    'placement': ('darkness_variation', 'vertical_misalignment', 'char_spacing'),
+    'raster': (),
+    'effects': ('ink_splatter', 'ink_fade', 'ink_effect_prob', 'ink_engine')
+}
+
+
+@dataclass
+class RenderSettings:
+    #Plain snapshot of the paper and typewriter settings, so pages can be
+    #rendered without the settings widgets
+    paper_size: str = "a4"
+    dpi: int = 300
+    margin: int = 20  #mm
+    font_size: int = 12  #pt
+    darkness_variation: float = 0.17
+    vertical_misalignment: float = 0.4
+    char_spacing: float = 0.45
+    ink_splatter: bool = True
+    ink_fade: bool = True
+    ink_effect_prob: float = 0.3
+    ink_engine: str = "classic"
+
+    @classmethod
+    def from_widgets(cls, paper_settings, typewriter_settings):
+        return cls(
+            paper_size=paper_settings.paper_size.currentText(),
+            dpi=paper_settings.dpi.value(),
+            margin=paper_settings.margin.value(),
+            font_size=typewriter_settings.font_size.value(),
+            darkness_variation=typewriter_settings.darkness_variation.value(),
+            vertical_misalignment=typewriter_settings.vertical_misalignment.value(),
+            char_spacing=typewriter_settings.char_spacing.value(),
+            ink_splatter=typewriter_settings.ink_splatter.isChecked(),
+            ink_fade=typewriter_settings.ink_fade.isChecked(),
+            ink_effect_prob=typewriter_settings.ink_effect_prob.value(),
+            ink_engine=typewriter_settings.ink_engine.currentText()
+        )
+
+    @classmethod
+    def from_project(cls, project_data):
+        #Read the settings sections of a .typy project, missing keys keep their defaults
+        values = dict(project_data.get('paper_settings', {}))
+        values.update(project_data.get('typewriter_settings', {}))
+        known = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in values.items() if key in known})
+
+    def to_project(self):
+        values = asdict(self)
+        return {
+            'paper_settings': {key: values.pop(key) for key in PAPER_KEYS},
+            'typewriter_settings': values
+        }
+
+    def first_changed_stage(self, other):
+        #Index of the earliest stage reading a setting that differs from
+        #other, len(STAGES) when the snapshots render alike
+        for stage, name in enumerate(STAGES):
+            if any(getattr(self, key) != getattr(other, key) for key in STAGE_SETTINGS[name]):
+                return stage
+        return len(STAGES)
+
+    def get_page_size(self):
+        #Convert the paper size in mm to pixels at the chosen DPI
+        size_mm = PAPER_SIZES[self.paper_size]
+        width = int((size_mm[0] * self.dpi) / 25.4)
+        height = int((size_mm[1] * self.dpi) / 25.4)
+        return (width, height)
+
+    def get_margin_pixels(self):
+        return int((self.margin * self.dpi) / 25.4)
+
+    def get_font_size_pixels(self):
+        return int((self.font_size * self.dpi) / 72)
+
+    def get_font(self):
+        font = QFont('Courier')
+        font.setPixelSize(self.get_font_size_pixels())
+        return font
+
+    def get_effect_scale(self):
+        #Scaling factor for effects based on font size
+        return self.get_font_size_pixels() / 12.0
+
+
+def read_lines(file_name, chunk_size=CHUNK_SIZE):
+    #Yield the lines of a text file without holding more than a chunk in memory.
+    #Split like the editor text, only at \n, with the \r of \r\n dropped; a
+    #line stays pending until its \n arrives, so a \r\n across chunks is one break
+    with open(file_name, 'r', encoding='utf-8', newline='') as file:
+        pending = ''
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            lines = (pending + chunk).split('\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line[:-1] if line.endswith('\r') else line
+        yield pending[:-1] if pending.endswith('\r') else pending
+
+
+def layout_pages(lines, settings, fonts=None, offsets=None):
+    #Word wrap and paginate source lines as they arrive, yielding the
+    #(text, y) placements of each page as soon as it is full. Given a list
+    #as offsets, the text offset where every placed line starts is appended
+    fonts = fonts or FontSet(settings.get_font())
+    page_width, page_height = settings.get_page_size()
+    margin_pixels = settings.get_margin_pixels()
+    line_height = int(settings.get_font_size_pixels() * 1.5)  #1.5 line spacing
+    available_width = page_width - (2 * margin_pixels)
+    bottom = page_height - margin_pixels
+    space_width = fonts.advance(' ')
+
+    page = []
+    y_position = margin_pixels
+    #Placed lines are the source text cut at spaces, each keeping the space
+    #or line break after it, so their lengths add up to the text offsets
+    text_offset = 0
+    for line in lines:
+        if line.strip() == PAGE_BREAK_MARKER:
+            text_offset += len(line) + 1
+            yield page
+            page = []
+            y_position = margin_pixels
+            continue
+
+        current_line = ''
+        current_width = 0
+        for word in line.split(' '):
+            #Summed per character, the advances placement moves the glyphs by
+            word_width = fonts.text_advance(word) + space_width
+            if current_width + word_width > available_width:
+                #Place the current line and start a new one
+                page.append((current_line, y_position))
+                if offsets is not None:
+                    offsets.append(text_offset)
+                text_offset += len(current_line)
+                y_position += line_height
+                current_line = word + ' '
+                current_width = word_width
+                if y_position + line_height > bottom:
+                    yield page
+                    page = []
+                    y_position = margin_pixels
+            else:
+                current_line += word + ' '
+                current_width += word_width
+
+        #Place the last line
+        page.append((current_line, y_position))
+        if offsets is not None:
+            offsets.append(text_offset)
+        text_offset += len(current_line)
+        y_position += line_height
+        if y_position + line_height > bottom:
+            yield page
+            page = []
+            y_position = margin_pixels
+
+    #The final page
+    yield page
+
+
+class PageRenderer:
+    #Rasterizes laid out pages with the typewriter simulation
+
+    def __init__(self, settings, seed=None):
+        #Every page draws its jitter from its own generator seeded by the page
+        #number, so pages can be rendered in any order and re-render identically
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = random.Random()
+        self.effects_rng = random.Random()
+        self.settings = settings
+        self.font = settings.get_font()
+        self.fonts = FontSet(self.font)
+        self.metrics = self.fonts.metrics
+        self.effect_scale = settings.get_effect_scale()
+        self.page_width, self.page_height = settings.get_page_size()
+        self.margin_pixels = settings.get_margin_pixels()
+
+        #numpy backed effects are only imported once a page is rendered
+        from effects import RasterInkEffects, RibbonWear
+
+        #Raster engine collects affected glyphs and applies them per page
+        self.ink_effects = None
+        if settings.ink_engine == "raster":
+            self.ink_effects = RasterInkEffects(self.fonts, self.effect_scale, self.seed)
+
+        #Ribbon wear fades the ink of each finished page
+        self.ribbon_wear = None
+        if settings.ink_fade:
+            self.ribbon_wear = RibbonWear(
+                self.font, self.margin_pixels,
+                self.page_width - 2 * self.margin_pixels, self.effect_scale, self.seed)
+
+    def layout(self, lines, offsets=None):
+        return layout_pages(lines, self.settings, self.fonts, offsets)
+
+    def render_pages(self, lines):
+        #Yield finished page images while the source lines are still arriving
+        line_offset = 0
+        for index, page in enumerate(self.layout(lines)):
+            yield self.render(page, index, line_offset)
+            line_offset += len(page)
+
+    def create_blank_page(self):
+        page = QImage(self.page_width, self.page_height, QImage.Format.Format_RGB32)
+        page.fill(QColor('#ffffff'))  #Fill with white by default
+        return page
+
+    def render(self, lines, index=0, line_offset=0):
+        #All stages in one go, see RenderPipeline for reusing stage outputs
+        page = self.create_blank_page()
+        self.replay(page, self.display(lines, index, line_offset))
+        return page
+
+    def display(self, lines, index=0, line_offset=0):
+        #Display list of a whole page, its glyphs followed by their effects
+        display = self.place(lines, index, line_offset)
+        display.extend(self.effect_ops(lines, display, index, line_offset))
+        return display
+
+    def place(self, lines, index, line_offset=0):
+        #Glyph placement stage: position and darkness of every character,
+        #from the laid out (text, y) lines of a page
+        settings = self.settings
+        effect_scale = self.effect_scale
+        ascent = self.metrics.ascent()
+        self.rng.seed(self.seed * 1000003 + index)
+
+        glyphs = DisplayList(index, line_offset)
+        for text, y in lines:
+            x = self.margin_pixels
+            baseline = y + ascent
+            for char in text:
+                #Calculate variations
+                darkness = self.rng.uniform(
+                    1.0 - settings.darkness_variation,
+                    1.0
+                )
+                v_offset = self.rng.uniform(
+                    -settings.vertical_misalignment * effect_scale,
+                    settings.vertical_misalignment * effect_scale
+                )
+                char_x = x + self.rng.uniform(-0.5, 0.5) * effect_scale
+                #Pen width scales with font size
+                glyphs.add(GLYPH, ord(char), char_x, baseline + v_offset, darkness, effect_scale)
+
+                #Move to next character position
+                x += self.fonts.advance(char) + self.rng.uniform(
+                    -settings.char_spacing * effect_scale,
+                    settings.char_spacing * effect_scale
+                )
+        return glyphs
+
+    def begin_painter(self, page, draft=False):
+        painter = QPainter(page)
+        if draft:
+            #Aliased text is several times cheaper to draw and good enough mid-typing
+            painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, False)
+        else:
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self.font)
+        return painter
+
+    def rasterize(self, glyphs, draft=False):
+        #Rasterization stage: the placed glyphs on blank paper
+        page = self.create_blank_page()
+        self.replay(page, glyphs, draft)
+        return page
+
+    def apply_effects(self, page, effects):
+        #Effects stage, in place on a rasterized page
+        self.replay(page, effects)
+
+    def replay(self, page, display, draft=False):
+        #Draw a display list made by this renderer onto a page. Stamps and
+        #ribbon wear are collected and applied once everything else is drawn
+        painter = None
+        font = self.font
+        for kind, codepoint, x, y, alpha, width in display:
+            if kind == STAMP:
+                self.ink_effects.queue(chr(codepoint), x, y)
+                continue
+            if kind == RIBBON:
+                self.ribbon_wear.queue_line(y)
+                continue
+            painter = painter or self.begin_painter(page, draft)
+            color = QColor(0, 0, 0)
+            color.setAlphaF(alpha)
+            if kind == DOT:
+                painter.setPen(QPen(color, width, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap))
+                painter.drawPoint(int(x), int(y))
+                continue
+            char = chr(codepoint)
+            if self.fonts.font_for(char) is not font:
+                font = self.fonts.font_for(char)
+                painter.setFont(font)
+            painter.setPen(QPen(color, width))
+            painter.drawText(int(x), int(y), char)
+        if painter is not None:
+            painter.end()
+
+        if self.ink_effects is not None:
+            self.ink_effects.apply(page, display.index)
+        if self.ribbon_wear is not None:
+            self.ribbon_wear.apply(page, display.index, display.line_offset)
+
+    def effect_ops(self, lines, glyphs, index, line_offset):
+        #Effects stage as operations on top of the placed glyphs. Draws from
+        #its own generator, so effect settings never move the glyphs
+        settings = self.settings
+        effects = DisplayList(index, line_offset)
+        self.effects_rng.seed(f"{self.seed}:{index}:effects")
+
+        #Add ink effects
+        if settings.ink_splatter:
+            for kind, codepoint, x, y, darkness, width in glyphs:
+                if self.effects_rng.random() >= settings.ink_effect_prob:
+                    continue
+                if self.ink_effects is not None:
+                    effects.add(STAMP, codepoint, x, y)
+                else:
+                    self.add_ink_effects(effects, x, y, codepoint, darkness, self.effect_scale)
+
+        if self.ribbon_wear is not None:
+            for text, y in lines:
+                if text.strip():
+                    effects.add(RIBBON, 0, 0, y)
+        return effects
+
+    def generate_ink_splatter(self, x, y, scale):
+        splatter = []
+        #Generate random dots around the point
+        for _ in range(self.effects_rng.randint(3, 8)):
+            dx = self.effects_rng.gauss(0, 2) * scale
+            dy = self.effects_rng.gauss(0, 2) * scale
+            size = self.effects_rng.uniform(0.5, 2) * scale
+            alpha = self.effects_rng.uniform(0.1, 0.4)
+            splatter.append((x + dx, y + dy, size, alpha))
+        return splatter
+
+    def add_ink_effects(self, effects, x, y, codepoint, darkness, effect_scale):
+        #Original character with varying pressure
+        pressure_variations = [
+            (0.2, -0.5, -0.5),
+            (0.3, 0.5, 0.5),
+            (0.4, -0.3, 0.3)
+        ]
+
+        for alpha_mod, dx_mod, dy_mod in pressure_variations:
+            dx = dx_mod * effect_scale
+            dy = dy_mod * effect_scale
+            effects.add(INK, codepoint, x + dx, y + dy, darkness * alpha_mod, effect_scale * 0.8)
+
+        #Add ink bleeding effect
+        if self.effects_rng.random() < 0.3:
+            bleed_points = self.effects_rng.randint(2, 5)
+            for _ in range(bleed_points):
+                dx = self.effects_rng.gauss(0, 1) * effect_scale
+                dy = self.effects_rng.gauss(0, 1) * effect_scale
+                alpha = darkness * self.effects_rng.uniform(0.1, 0.3)
+                effects.add(INK, codepoint, x + dx, y + dy, alpha, effect_scale * 0.5)
+
+        #Add ink splatters
+        if self.effects_rng.random() < 0.2:
+            for dot_x, dot_y, size, alpha in self.generate_ink_splatter(x, y, effect_scale):
+                effects.add(DOT, 0, dot_x, dot_y, alpha, size)
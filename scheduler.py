@@ -0,0 +1,55 @@
+import time
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+
+class RenderScheduler(QObject):
+    #Debounces live preview renders by how long recent renders took: small
+    #documents update almost at once, large ones wait for a pause in typing.
+    #Every request restarts the wait, so a burst of edits or spin box steps
+    #collapses into a single render
+    renderDue = pyqtSignal()
+
+    MIN_DELAY = 40  #ms
+    MAX_DELAY = 1500  #ms
+    #Wait this many times the recent blocking render cost on top of the minimum
+    COST_FACTOR = 1.5
+    #Weight of the newest measurement in the moving average
+    SMOOTHING = 0.3
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cost = None  #seconds
+        self.started = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.renderDue.emit)
+
+    def delay(self):
+        if self.cost is None:
+            return self.MIN_DELAY
+        delay = self.MIN_DELAY + self.COST_FACTOR * self.cost * 1000
+        return int(min(self.MAX_DELAY, delay))
+
+    def request(self):
+        self.timer.start(self.delay())
+
+    def cancel(self):
+        self.timer.stop()
+
+    def isPending(self):
+        return self.timer.isActive()
+
+    def begin(self):
+        self.started = time.perf_counter()
+
+    def end(self):
+        #Fold the time since begin() into the moving average
+        if self.started is None:
+            return
+        cost = time.perf_counter() - self.started
+        self.started = None
+        if self.cost is None:
+            self.cost = cost
+        else:
+            self.cost += self.SMOOTHING * (cost - self.cost)
@@ -0,0 +1,292 @@
+import os
+import sys
+import json
+import time
+import base64
+import shutil
+import signal
+import tempfile
+import threading
+import socketserver
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import astuple
+
+#Renderers kept warm per worker, keyed by settings and seed
+RENDERER_CACHE = 8
+#Latencies kept for the metrics percentiles
+LATENCY_WINDOW = 1000
+#Values of a job's format, the extension of the file it is written to
+OUTPUT_FORMATS = ('pdf', 'png', 'tif')
+
+#Per worker process state, set up by init_worker
+worker_app = None
+renderers = OrderedDict()
+
+
+def init_worker():
+    #Runs once in every worker: Qt, fonts, glyph metrics and the effects
+    #module are loaded before the first job arrives
+    global worker_app
+    os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    from PyQt6.QtGui import QGuiApplication
+    from render import RenderSettings
+    import export  #Loaded now rather than by the first job
+
+    worker_app = QGuiApplication(sys.argv[:1])
+    renderer = get_renderer(RenderSettings(), 0)
+    renderer.render(list(renderer.layout(["typy"]))[0])
+
+
+def warm_up():
+    return os.getpid()
+
+
+def get_renderer(settings, seed):
+    from render import PageRenderer
+
+    key = (astuple(settings), seed)
+    if key in renderers:
+        renderers.move_to_end(key)
+        return renderers[key]
+    renderer = PageRenderer(settings, seed)
+    renderers[key] = renderer
+    if len(renderers) > RENDERER_CACHE:
+        renderers.popitem(last=False)
+    return renderer
+
+
+def render_job(job):
+    #Render one job in a worker. Jobs look like a .typy project: text plus
+    #paper_settings and typewriter_settings, with the output options
+    from render import RenderSettings
+    from export import open_page_writer, get_profile
+
+    started = time.time()
+    settings = RenderSettings.from_project(job)
+    renderer = get_renderer(settings, job.get('seed', 0))
+    output_format = job.get('format', 'pdf')
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    profile = get_profile(job.get('profile', 'color'), job.get('quality'), job.get('export_dpi'))
+    return_bytes = job.get('return') == 'bytes'
+
+    if return_bytes or not job.get('output'):
+        directory = tempfile.mkdtemp(prefix='typy-job-')
+        output = os.path.join(directory, f"document.{output_format}")
+    else:
+        directory = None
+        output = job['output']
+
+    writer = open_page_writer(output, settings, profile)
+    try:
+        for page in renderer.render_pages(job['text'].split('\n')):
+            writer.add_page(page)
+    except Exception:
+        writer.abort()
+        if directory is not None:
+            shutil.rmtree(directory)
+        raise
+    writer.close()
+
+    files = getattr(writer, 'files', [output])
+    result = {'pages': writer.page_count, 'started': started}
+    if return_bytes:
+        data = []
+        for file_name in files:
+            with open(file_name, 'rb') as f:
+                data.append(base64.b64encode(f.read()).decode())
+        shutil.rmtree(directory)
+        result['data'] = data
+    else:
+        result['files'] = files
+    result['finished'] = time.time()
+    return result
+
+
+class ServiceMetrics:
+    #Queue depth and latency of the jobs seen by the service
+
+    def __init__(self, workers):
+        self.lock = threading.Lock()
+        self.workers = workers
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  #ms, received to answered
+        self.render_times = deque(maxlen=LATENCY_WINDOW)  #ms, in the worker
+
+    def job_received(self):
+        with self.lock:
+            self.queued += 1
+
+    def job_finished(self, latency, render_time=None):
+        with self.lock:
+            self.queued -= 1
+            self.latencies.append(latency)
+            if render_time is None:
+                self.failed += 1
+            else:
+                self.completed += 1
+                self.render_times.append(render_time)
+
+    def snapshot(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            render_times = list(self.render_times)
+            return {
+                'workers': self.workers,
+                'queue_depth': self.queued,
+                'completed': self.completed,
+                'failed': self.failed,
+                'latency_ms': {
+                    'mean': sum(latencies) / len(latencies) if latencies else 0,
+                    'p50': percentile(latencies, 0.5),
+                    'p95': percentile(latencies, 0.95)
+                },
+                'render_ms': {
+                    'mean': sum(render_times) / len(render_times) if render_times else 0
+                }
+            }
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class RenderService:
+    #Accepts JSON-lines requests and answers each with one JSON line, in the
+    #order jobs finish. Every request may carry an id that is echoed back.
+    #{"command": "metrics"} answers with the current metrics
+
+    def __init__(self, workers=None):
+        workers = workers or os.cpu_count() or 1
+        self.metrics = ServiceMetrics(workers)
+        self.pool_lock = threading.Lock()
+        self.executor = self.start_pool()
+
+    def start_pool(self):
+        workers = self.metrics.workers
+        #Spawned, so workers never inherit a half initialised Qt from this process
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker
+        )
+        #One task per worker starts all of them now instead of on first use
+        for future in [executor.submit(warm_up) for _ in range(workers)]:
+            future.result()
+        return executor
+
+    def submit(self, request):
+        with self.pool_lock:
+            try:
+                return self.executor.submit(render_job, request)
+            except BrokenProcessPool:
+                #A worker died and took the pool with it, the jobs it had
+                #fail on their own; later jobs get a new pool
+                self.executor.shutdown(wait=False)
+                self.executor = self.start_pool()
+                return self.executor.submit(render_job, request)
+
+    def handle(self, line, respond):
+        #respond is called with the answer, possibly from another thread
+        received = time.time()
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            respond({'ok': False, 'error': f"Invalid request: {str(e)}"})
+            return
+        if not isinstance(request, dict):
+            respond({'ok': False, 'error': "Invalid request: expected a JSON object"})
+            return
+
+        if request.get('command') == 'metrics':
+            respond({'id': request.get('id'), 'ok': True, 'metrics': self.metrics.snapshot()})
+            return
+
+        self.metrics.job_received()
+        try:
+            future = self.submit(request)
+        except Exception as e:
+            self.metrics.job_finished((time.time() - received) * 1000)
+            respond({'id': request.get('id'), 'ok': False, 'error': f"{type(e).__name__}: {e}"})
+            return
+        future.add_done_callback(lambda future: self.job_done(request, received, future, respond))
+
+    def job_done(self, request, received, future, respond):
+        answered = time.time()
+        latency = (answered - received) * 1000
+        try:
+            result = future.result()
+        except Exception as e:
+            self.metrics.job_finished(latency)
+            respond({'id': request.get('id'), 'ok': False, 'error': f"{type(e).__name__}: {e}"})
+            return
+
+        render_time = (result.pop('finished') - result['started']) * 1000
+        queue_time = (result.pop('started') - received) * 1000
+        self.metrics.job_finished(latency, render_time)
+        result.update({
+            'id': request.get('id'),
+            'ok': True,
+            'queue_ms': round(queue_time, 1),
+            'render_ms': round(render_time, 1),
+            'latency_ms': round(latency, 1)
+        })
+        respond(result)
+
+    def serve_stdin(self):
+        lock = threading.Lock()
+
+        def respond(answer):
+            with lock:
+                sys.stdout.write(json.dumps(answer) + '\n')
+                sys.stdout.flush()
+
+        for line in sys.stdin:
+            if line.strip():
+                self.handle(line, respond)
+        #Answer everything still in flight before exiting
+        self.executor.shutdown(wait=True)
+
+    def serve_socket(self, path):
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                lock = threading.Lock()
+                pending = threading.Semaphore(0)
+                count = 0
+
+                def respond(answer):
+                    with lock:
+                        try:
+                            self.wfile.write((json.dumps(answer) + '\n').encode())
+                            self.wfile.flush()
+                        except OSError:
+                            pass  #Client went away
+                    pending.release()
+
+                for line in self.rfile:
+                    if line.strip():
+                        count += 1
+                        service.handle(line.decode(), respond)
+                #Keep the connection open until every job on it is answered
+                for _ in range(count):
+                    pending.acquire()
+
+        if os.path.exists(path):
+            os.unlink(path)
+        #Stopping the service removes the socket again
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+            try:
+                server.serve_forever()
+            finally:
+                os.unlink(path)
+                self.executor.shutdown(wait=True)
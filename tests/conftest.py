@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+#Run from anywhere, without a display
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
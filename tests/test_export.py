@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+from PyQt6.QtGui import QImage, QColor
+
+from export import get_profile, page_pixels
+
+
+def make_page(width=400, height=300):
+    page = QImage(width, height, QImage.Format.Format_RGB32)
+    page.fill(QColor(10, 20, 30))
+    return page
+
+
+def test_downsampled_pixels_outlive_the_scaled_page(app):
+    pixels = page_pixels(make_page(), get_profile('color', dpi=150), 300)
+    assert pixels.shape == (150, 200, 3)
+    assert pixels.flags['C_CONTIGUOUS'] and pixels.flags['OWNDATA']
+    assert (pixels == [10, 20, 30]).all()
+
+
+def test_gray_pixels_are_one_plane(app):
+    pixels = page_pixels(make_page(), get_profile('gray'), 300)
+    assert pixels.shape == (300, 400)
+    assert pixels.dtype == np.uint8
+    assert (pixels == 30).all()
+
+
+def test_packed_page_is_read_in_place(app):
+    from pagestore import PageStore
+
+    store = PageStore([make_page(), make_page()], budget=1)
+    page = store.load(0)
+    address = int(page.constBits())
+    pixels = page_pixels(page, get_profile('color'), 300)
+    assert int(page.constBits()) == address
+    assert (pixels == [10, 20, 30]).all()
+
+
+def make_pages(count):
+    return [make_page(120, 160) for _ in range(count)]
+
+
+def export_file(tmp_path, name='book.pdf'):
+    from render import RenderSettings
+
+    return str(tmp_path / name), RenderSettings(dpi=72)
+
+
+def test_incremental_pdf_update_encodes_changed_pages(app, tmp_path):
+    from pypdf import PdfReader
+    from export import IncrementalExport
+
+    file_name, settings = export_file(tmp_path)
+    exporter = IncrementalExport()
+    pages = make_pages(4)
+    assert exporter.export(file_name, pages, settings, keys=['a', 'b', 'c', 'd']) == 4
+    size = tmp_path.joinpath('book.pdf').stat().st_size
+
+    pages.append(make_page(120, 160))
+    assert exporter.export(file_name, pages, settings, keys=['a', 'x', 'c', 'd', 'e'], atomic=True) == 2
+    assert tmp_path.joinpath('book.pdf').stat().st_size > size
+    assert len(PdfReader(file_name).pages) == 5
+
+    assert exporter.export(file_name, pages[:3], settings, keys=['a', 'x', 'c']) == 0
+    assert len(PdfReader(file_name).pages) == 3
+    assert [path.name for path in tmp_path.iterdir()] == ['book.pdf']
+
+
+@pytest.mark.parametrize('error', [ValueError, KeyboardInterrupt])
+@pytest.mark.parametrize('atomic', [False, True])
+def test_failed_update_keeps_previous_export(app, tmp_path, monkeypatch, atomic, error):
+    from pypdf import PdfReader
+    from export import IncrementalExport, PdfPageWriter
+
+    file_name, settings = export_file(tmp_path)
+    exporter = IncrementalExport()
+    exporter.export(file_name, make_pages(3), settings, keys=['a', 'b', 'c'])
+    before = tmp_path.joinpath('book.pdf').read_bytes()
+
+    def fail(self, page):
+        raise error("encoder failed")
+    monkeypatch.setattr(PdfPageWriter, 'encode_image', fail)
+    with pytest.raises(error):
+        exporter.export(file_name, make_pages(3), settings, keys=['a', 'x', 'c'], atomic=atomic)
+    assert tmp_path.joinpath('book.pdf').read_bytes() == before
+    assert [path.name for path in tmp_path.iterdir()] == ['book.pdf']
+    assert len(PdfReader(file_name).pages) == 3
+
+
+def test_incremental_png_set_rewrites_changed_pages(app, tmp_path):
+    from export import IncrementalExport
+
+    file_name, settings = export_file(tmp_path, 'book.png')
+    exporter = IncrementalExport()
+    exporter.export(file_name, make_pages(3), settings, keys=['a', 'b', 'c'])
+    stamps = {path.name: path.stat().st_mtime_ns for path in tmp_path.iterdir()}
+
+    assert exporter.export(file_name, make_pages(2), settings, keys=['a', 'x']) == 1
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names == ['book_page_1.png', 'book_page_2.png']
+    assert tmp_path.joinpath('book_page_1.png').stat().st_mtime_ns == stamps['book_page_1.png']
+
+
+def test_page_that_fails_to_encode_takes_no_object_numbers(app, tmp_path, monkeypatch):
+    from pypdf import PdfReader
+    from export import PdfPageWriter
+
+    file_name, settings = export_file(tmp_path)
+    writer = PdfPageWriter(file_name, settings)
+    writer.add_page(make_page(120, 160))
+    encode_image = PdfPageWriter.encode_image
+
+    def fail(self, page):
+        raise ValueError("encoder failed")
+    monkeypatch.setattr(PdfPageWriter, 'encode_image', fail)
+    with pytest.raises(ValueError):
+        writer.add_page(make_page(120, 160))
+    monkeypatch.setattr(PdfPageWriter, 'encode_image', encode_image)
+    writer.add_page(make_page(120, 160))
+    writer.close()
+    assert len(PdfReader(file_name).pages) == 2
+
+
+@pytest.mark.parametrize('name', ['book.pdf', 'book.png', 'book.tif'])
+def test_interrupted_atomic_export_leaves_no_temp_files(app, tmp_path, monkeypatch, name):
+    import export
+
+    file_name, settings = export_file(tmp_path, name)
+    pages = make_pages(3)
+
+    def interrupt():
+        yield pages[0]
+        yield pages[1]
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        export.write_atomic(file_name, interrupt(), settings)
+    assert list(tmp_path.iterdir()) == []
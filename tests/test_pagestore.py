@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from PyQt6.QtGui import QImage
+
+from effects import page_array
+from pagestore import PageStore, PAGE_FORMAT
+
+WIDTH, HEIGHT = 200, 300
+PAGE_BYTES = WIDTH * HEIGHT * 4
+
+
+def make_page(seed):
+    #Noise, so pages barely compress and have to be spilled
+    image = QImage(WIDTH, HEIGHT, PAGE_FORMAT)
+    page_array(image)[:] = np.random.default_rng(seed).integers(0, 2 ** 32, (HEIGHT, WIDTH), dtype=np.uint32)
+    return image
+
+
+def spilled(store):
+    return [index for index, entry in enumerate(store.entries)
+            if isinstance(entry, tuple) and isinstance(entry[0], memoryview)]
+
+
+@pytest.fixture
+def store(app):
+    return PageStore([make_page(seed) for seed in range(8)], budget=3 * PAGE_BYTES)
+
+
+def test_pages_spill_within_budget(store):
+    assert store.memory_usage() <= store.budget
+    assert spilled(store)
+    assert store.size(0) == (WIDTH, HEIGHT)
+
+
+def test_spilled_pages_read_back_unchanged(store):
+    for index, page in enumerate(store):
+        assert page == make_page(index)
+    for index in (0, 5, 1):
+        assert store[index] == make_page(index)
+        assert store.memory_usage() <= store.budget
+
+
+def test_replaced_page_reuses_its_scratch_slot(store):
+    index = spilled(store)[0]
+    end = store.scratch_end
+    store[index] = make_page(100)
+    #Newer pages push it out of memory again
+    store.extend(make_page(seed) for seed in range(101, 104))
+    assert index in spilled(store)
+    assert store.slots[index][0] < end
+    assert store[index] == make_page(100)
+
+
+def test_resize_drops_and_pads_pages(store):
+    store.resize(2)
+    assert len(store) == 2
+    assert store.memory_usage() <= store.budget
+    store.resize(4)
+    assert store[3] is None
+    assert store.size(3) is None
+    assert store[1] == make_page(1)
@@ -0,0 +1,67 @@
+from dataclasses import replace
+
+import pytest
+
+from render import RenderSettings, PageRenderer
+from pipeline import RenderPipeline
+
+SETTINGS = RenderSettings(dpi=72, paper_size='a5')
+TEXT = [f"line {number} of the manuscript" for number in range(120)]
+
+
+@pytest.fixture
+def pipeline(app, monkeypatch):
+    pipeline = RenderPipeline(0, 64 * 1024 * 1024)
+    layout = PageRenderer.layout
+    pipeline.layout_runs = 0
+
+    def counted(renderer, lines, offsets=None):
+        pipeline.layout_runs += 1
+        return layout(renderer, lines, offsets)
+    monkeypatch.setattr(PageRenderer, 'layout', counted)
+
+    pipeline.update(TEXT, SETTINGS)
+    for index in range(pipeline.page_count()):
+        pipeline.render(index)
+    return pipeline
+
+
+def test_unchanged_update_has_nothing_to_do(pipeline):
+    assert pipeline.update(list(TEXT), replace(SETTINGS)) == []
+    assert pipeline.layout_runs == 1
+
+
+def test_effects_change_keeps_layout_placements_and_rasters(pipeline):
+    count = pipeline.page_count()
+    assert count > 2
+    placements = list(pipeline.placements)
+    rasters = dict(pipeline.rasters)
+    assert len(rasters) == count
+
+    dirty = pipeline.update(TEXT, replace(SETTINGS, ink_effect_prob=0.9))
+    assert dirty == list(range(count))
+    assert pipeline.layout_runs == 1
+    assert all(new is old for new, old in zip(pipeline.placements, placements))
+    assert all(pipeline.rasters[index] is raster for index, raster in rasters.items())
+
+
+def test_placement_change_keeps_layout_only(pipeline):
+    dirty = pipeline.update(TEXT, replace(SETTINGS, char_spacing=0.2))
+    assert dirty == list(range(pipeline.page_count()))
+    assert pipeline.layout_runs == 1
+    assert pipeline.placements == [None] * pipeline.page_count()
+    assert not pipeline.rasters
+
+
+def test_text_edit_dirties_only_its_page(pipeline):
+    index = pipeline.text_index
+    line, _ = index.source_position(index.offsets[index.page_starts[1]])
+    keys = [pipeline.page_key(page) for page in range(pipeline.page_count())]
+
+    text = list(TEXT)
+    text[line] = text[line].replace('line', 'LINE')
+    assert pipeline.update(text, SETTINGS) == [1]
+    assert pipeline.layout_runs == 2
+    assert [pipeline.page_key(page) == key for page, key in enumerate(keys)].count(False) == 1
+    assert pipeline.placements[1] is None
+    assert 1 not in pipeline.rasters and 0 in pipeline.rasters
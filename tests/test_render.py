@@ -0,0 +1,18 @@
+import pytest
+
+from render import read_lines
+
+
+@pytest.mark.parametrize('text', [
+    'abc\r\ndef',
+    'abc\ndef\n',
+    'one\r\n\r\ntwo\r\n',
+    'form\x0cfeed separator\x85next',
+    '',
+])
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4, 64])
+def test_read_lines_splits_like_the_editor(tmp_path, text, chunk_size):
+    path = tmp_path / 'manuscript.txt'
+    path.write_bytes(text.encode('utf-8'))
+    expected = text.replace('\r\n', '\n').split('\n')
+    assert list(read_lines(str(path), chunk_size)) == expected
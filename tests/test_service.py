@@ -0,0 +1,58 @@
+import os
+import json
+import threading
+
+import pytest
+
+from service import RenderService
+
+
+@pytest.fixture(scope='module')
+def service():
+    service = RenderService(workers=1)
+    yield service
+    service.executor.shutdown(wait=True)
+
+
+def ask(service, line):
+    answers = []
+    answered = threading.Event()
+
+    def respond(answer):
+        answers.append(answer)
+        answered.set()
+    service.handle(line, respond)
+    assert answered.wait(60)
+    return answers[0]
+
+
+@pytest.mark.parametrize('line', ['[1, 2]', '"text"', '3', 'null'])
+def test_request_that_is_not_an_object_is_answered_with_an_error(service, line):
+    answer = ask(service, line)
+    assert answer['ok'] is False
+    assert 'JSON object' in answer['error']
+
+
+def test_pool_is_started_again_after_a_worker_dies(service):
+    with pytest.raises(Exception):
+        service.executor.submit(os._exit, 1).result()
+    answer = ask(service, '{"id": 7, "text": "typy", "return": "bytes"}')
+    assert answer['ok'] is True
+    assert answer['id'] == 7
+    assert answer['pages'] == 1
+    assert ask(service, '{"command": "metrics"}')['metrics']['completed'] == 1
+
+
+@pytest.mark.parametrize('output_format', ['docx', '../x', 'pdf/../../x'])
+def test_unknown_output_format_is_answered_with_an_error(service, output_format):
+    answer = ask(service, json.dumps({'id': 3, 'text': 'typy', 'format': output_format, 'return': 'bytes'}))
+    assert answer['ok'] is False
+    assert answer['id'] == 3
+    assert 'Unknown output format' in answer['error']
+
+
+@pytest.mark.parametrize('output_format', ['png', 'tif'])
+def test_image_formats_are_rendered(service, output_format):
+    answer = ask(service, json.dumps({'text': 'typy', 'format': output_format, 'return': 'bytes'}))
+    assert answer['ok'] is True
+    assert len(answer['data']) == (1 if output_format == 'tif' else answer['pages'])
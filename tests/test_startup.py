@@ -0,0 +1,39 @@
+import os
+import sys
+import subprocess
+
+#Cold import of the window module must stay within this
+IMPORT_BUDGET = 0.15  #seconds
+#Only loaded on first export or save, never at startup
+DEFERRED_MODULES = ('reportlab', 'PIL', 'PyQt6.QtPrintSupport', 'json', 'base64',
+                    'numpy', 'effects', 'export', 'project')
+#Best of this many cold starts, a busy machine should not fail the budget
+ATTEMPTS = 3
+
+
+def cold_import():
+    #Measured in a fresh interpreter, so nothing is imported already
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import ui\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(' '.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True, text=True, check=True
+    )
+    elapsed, loaded = (result.stdout.splitlines() + [''])[:2]
+    return float(elapsed), loaded.split()
+
+
+def test_startup_defers_export_modules():
+    _, loaded = cold_import()
+    assert loaded == []
+
+
+def test_startup_import_within_budget():
+    elapsed = min(cold_import()[0] for _ in range(ATTEMPTS))
+    assert elapsed <= IMPORT_BUDGET, f"import ui took {elapsed * 1000:.0f}ms"
@@ -0,0 +1,45 @@
+import pytest
+
+from textindex import utf16_length, code_point_column
+
+TEXT = ['Dear 😀 reader,', '', 'the 𝄞 clef ' * 200, 'end']
+
+
+@pytest.fixture
+def index(app):
+    from render import RenderSettings
+    from pipeline import RenderPipeline
+
+    pipeline = RenderPipeline(0, 0)
+    pipeline.update(TEXT, RenderSettings(dpi=72, paper_size='a5'))
+    return pipeline.text_index
+
+
+def test_utf16_columns_round_trip():
+    line = 'a😀b𝄞c'
+    assert utf16_length(line) == 7
+    for column in range(len(line) + 1):
+        assert code_point_column(line, utf16_length(line[:column])) == column
+
+
+def test_source_lines_map_to_text_offsets(index):
+    text = '\n'.join(TEXT)
+    for line, source in enumerate(TEXT):
+        offset = index.source_offset(line, 0)
+        assert text[offset:offset + len(source)] == source
+        assert index.source_position(offset + len(source)) == (line, len(source))
+
+
+def test_position_and_offset_at_agree(index):
+    assert index.page_count() > 1
+    text = '\n'.join(TEXT)
+    for offset in range(0, len(text), 7):
+        if text[offset] in ' \n':
+            continue  #Breaks and the spaces at them have no place of their own
+        page, _, x, y = index.position(offset)
+        assert index.offset_at(page, x + 1, y + 1) == offset
+
+
+def test_offset_at_outside_the_pages(index):
+    assert index.offset_at(-1, 0, 0) is None
+    assert index.offset_at(index.page_count(), 0, 0) is None
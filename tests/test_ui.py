@@ -0,0 +1,43 @@
+import pytest
+from PyQt6.QtCore import Qt, QEvent, QPointF, QThreadPool
+from PyQt6.QtGui import QKeyEvent
+
+
+@pytest.fixture
+def window(app):
+    from ui import TypewriterConverter
+
+    window = TypewriterConverter()
+    window.resize(1200, 800)
+    window.show()
+    app.processEvents()
+    window.text_edit.setPlainText('typy')
+    window.convert_text()
+    yield window
+    QThreadPool.globalInstance().waitForDone()
+    window.close()
+
+
+def press(window, key):
+    window.keyPressEvent(QKeyEvent(QEvent.Type.KeyPress, key, Qt.KeyboardModifier.ControlModifier))
+
+
+def test_keyboard_zoom_keeps_the_page_centred(window):
+    preview = window.preview
+    assert not preview.continuous
+    center = QPointF(preview.pageRect(0).center())
+    for key in (Qt.Key.Key_Plus, Qt.Key.Key_Plus, Qt.Key.Key_Plus, Qt.Key.Key_Minus):
+        press(window, key)
+        moved = QPointF(preview.pageRect(0).center()) - center
+        assert abs(moved.x()) <= 1 and abs(moved.y()) <= 1
+    assert preview.zoom == pytest.approx(1.1 ** 2)
+    assert window.zoom_label.text() == "Zoom: 121%"
+
+
+def test_anchored_zoom_keeps_the_point_under_the_anchor(window):
+    preview = window.preview
+    anchor = QPointF(300, 200)
+    _, before = preview.pageAt(anchor)
+    preview.setZoom(preview.zoom * 1.5, anchor)
+    _, after = preview.pageAt(anchor)
+    assert abs(after.x() - before.x()) <= 2 and abs(after.y() - before.y()) <= 2
@@ -0,0 +1,85 @@
+import bisect
+from array import array
+from itertools import accumulate
+
+
+def utf16_length(text):
+    return len(text.encode('utf-16-le')) // 2
+
+
+def code_point_column(text, position):
+    #Column in code points of a position in UTF-16 units, as Qt counts them
+    return len(text.encode('utf-16-le')[:2 * position].decode('utf-16-le', 'ignore'))
+
+
+class TextIndex:
+    #Where each laid out line of the editor text landed: its offset in the
+    #text, page and y, in flat arrays ordered by offset, which is also page
+    #and y order. Looking up either way is a bisect to the line plus a walk
+    #along that one line's advances, layout never has to run again. Offsets
+    #count code points; the editor counts UTF-16 units, so it goes through
+    #source_offset and source_position with columns inside one line
+
+    def __init__(self, fonts, margin, source_lines=()):
+        self.fonts = fonts
+        self.margin = margin
+        #Text offset of each source line's first character
+        self.line_starts = array('q', accumulate((len(line) + 1 for line in source_lines), initial=0))
+        self.offsets = array('q')  #Text offset of each line's first character
+        self.pages = array('l')
+        self.ys = array('l')  #Top of each line on its page
+        self.texts = []  #Line text, the trailing space stands for the break after it
+        self.page_starts = array('l', [0])  #First line of each page, plus the end
+
+    def add_page(self, lines, offsets):
+        page = len(self.page_starts) - 1
+        for (text, y), offset in zip(lines, offsets):
+            self.offsets.append(offset)
+            self.pages.append(page)
+            self.ys.append(int(y))
+            self.texts.append(text)
+        self.page_starts.append(len(self.offsets))
+
+    def page_count(self):
+        return len(self.page_starts) - 1
+
+    def source_offset(self, line, column):
+        #Text offset of a column on a source line
+        line = min(line, len(self.line_starts) - 1)
+        return self.line_starts[line] + column
+
+    def source_position(self, offset):
+        #(source line, column) of a text offset
+        line = max(0, bisect.bisect_right(self.line_starts, offset) - 1)
+        return (line, offset - self.line_starts[line])
+
+    def position(self, offset):
+        #(page, line on that page, x, y) of the character at a text offset
+        if not self.offsets:
+            return None
+        line = max(0, bisect.bisect_right(self.offsets, offset) - 1)
+        text = self.texts[line]
+        column = min(max(0, offset - self.offsets[line]), max(0, len(text) - 1))
+        x = self.margin + sum(self.fonts.advance(char) for char in text[:column])
+        page = self.pages[line]
+        return (page, line - self.page_starts[page], x, self.ys[line])
+
+    def offset_at(self, page, x, y):
+        #Text offset of the character nearest a point on a page
+        if not self.offsets or not 0 <= page < self.page_count():
+            return None
+        first, last = self.page_starts[page], self.page_starts[page + 1]
+        if first == last:
+            #A page without lines, left by a page break
+            return self.offsets[min(first, len(self.offsets) - 1)]
+        line = max(first, bisect.bisect_right(self.ys, y, first, last) - 1)
+        text = self.texts[line]
+        position = self.margin
+        column = 0
+        while column < len(text) - 1:
+            advance = self.fonts.advance(text[column])
+            if position + advance / 2 > x:
+                break
+            position += advance
+            column += 1
+        return self.offsets[line] + column
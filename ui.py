@@ -1,35 +1,71 @@
 import sys
 
-from PyQt6.QtPrintSupport import QPrinter
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QFileDialog, QLabel, QScrollArea,                      QSlider, QGroupBox, QFormLayout, QSpinBox, QDoubleSpinBox,
-                             QStyle, QMessageBox, QPlainTextEdit)
-from PyQt6.QtGui import QFont, QPainter, QColor, QImage, QPen, QPageSize
-from PyQt6.QtCore import Qt, QTimer, QMarginsF, QSizeF, QByteArray, QBuffer
+                             QStyle, QMessageBox, QPlainTextEdit, QCheckBox)
+from PyQt6.QtGui import QFont, QPainter, QPageSize
+from PyQt6.QtCore import Qt, QTimer, QMarginsF, QSizeF
 import os
 import random
-from PIL import Image
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
 
-import json
-import base64
-
-from widgets import ScrollableImage, PaperSettings, TypewriterSettings, PAGE_BREAK_MARKER
+#Export and project backends are imported on first use, not at startup
+
+from widgets import ScrollableImage, PaperSettings, TypewriterSettings, ExportSettings, ThumbnailStrip
+from render import RenderSettings, PageRenderer, read_lines
+from scheduler import RenderScheduler
+from pagestore import PageStore
+from pipeline import RenderPipeline
+from textindex import utf16_length, code_point_column
+
+#Text files above this size are streamed from disk instead of loaded into the editor
+STREAMING_THRESHOLD = 2 * 1024 * 1024
+EDITOR_WINDOW_LINES = 2000
+#Save dialog filters and the extension each one writes
+EXPORT_FILTERS = {
+    "PDF Document (*.pdf)": '.pdf',
+    "PNG Images (*.png)": '.png',
+    "TIFF Document (*.tif)": '.tif'
+}
+#Part of the page memory budget that caches page rasters before effects
+RASTER_SHARE = 0.25
+#Pause in typing before draft pages are redone at full quality
+FULL_QUALITY_DELAY = 400  #ms
 
 
 class TypewriterConverter(QMainWindow):
     def __init__(self):
         super().__init__()
         self.cached_text = {}
-        self.pages = []
-        self.update_timer = QTimer()
-        self.update_timer.setSingleShot(True)
-        self.update_timer.timeout.connect(self.convert_text)
+        self.pages = PageStore()
+
+        #Live preview: debounced by measured render cost, the visible page is
+        #rendered first and the others one per idle event loop turn
+        self.scheduler = RenderScheduler(self)
+        self.scheduler.renderDue.connect(self.preview_text)
+        self.idle_timer = QTimer()
+        self.idle_timer.timeout.connect(self.render_idle_page)
+        self.quality_timer = QTimer()
+        self.quality_timer.setSingleShot(True)
+        self.quality_timer.timeout.connect(self.idle_timer.start)
+        self.pending_pages = []
+        self.draft_pages = set()  #Pages showing a draft, always queued for full quality
+
+        #Same jitter on every re-render, so the preview does not shimmer while
+        #typing. The pipeline keeps stage outputs between renders
+        self.render_seed = random.getrandbits(32)
+        self.pipeline = RenderPipeline(self.render_seed, 0)
+        self.exporter = None  #Remembers the last export, created on first export
+
+        #Manuscript streamed from disk instead of the editor, if any
+        self.source_file = None
+        self.page_stream = None
+        self.stream_timer = QTimer()
+        self.stream_timer.timeout.connect(self.render_next_page)
 
         QApplication.instance().setAttribute(Qt.ApplicationAttribute.AA_SynthesizeTouchForUnhandledMouseEvents)
 
         self.initUI()
+        self.on_memory_budget_changed()
 
     def initUI(self):
         self.setWindowTitle("typy - A typewriter simulator by VX Software")
@@ -40,9 +76,7 @@ class TypewriterConverter(QMainWindow):
         self.rendered_pages = []  #List of rendered QImages
         self.page_text = []  #List of text content per page
         self.current_page = 0
-        self.rendered_chars = {}  #(page, x, y): (char, properties)
-        self.text_positions = {}  #(page, line, char_index): (x, y)
-        self.pages = []
+        self.pages = PageStore()
 
 
         #Create main widget and layout
@@ -109,15 +143,20 @@ class TypewriterConverter(QMainWindow):
         #Create settings
         self.typewriter_settings = TypewriterSettings()
         self.typewriter_settings.settingsChanged.connect(self.on_settings_changed)
+        self.typewriter_settings.memory_budget.valueChanged.connect(self.on_memory_budget_changed)
 
         self.paper_settings = PaperSettings()
         self.paper_settings.settingsChanged.connect(self.on_settings_changed)
 
+        #Only read on export, changes need no re-render
+        self.export_settings = ExportSettings()
+
         #Add all elements to left panel
         left_panel.addLayout(toolbar)
         left_panel.addWidget(self.text_edit)
         left_panel.addWidget(self.typewriter_settings)
         left_panel.addWidget(self.paper_settings)
+        left_panel.addWidget(self.export_settings)
 
         return left_panel
 
@@ -143,10 +182,15 @@ class TypewriterConverter(QMainWindow):
         self.reset_view_button = QPushButton("Fit to Screen")
         self.reset_view_button.clicked.connect(self.preview.fit_to_screen)
 
+        #Scroll through all pages instead of flipping one at a time
+        self.continuous_check = QCheckBox("Continuous")
+        self.continuous_check.toggled.connect(self.preview.setContinuous)
+
         nav_bar.addWidget(self.prev_button)
         nav_bar.addWidget(self.page_label)
         nav_bar.addWidget(self.next_button)
         nav_bar.addStretch()
+        nav_bar.addWidget(self.continuous_check)
         nav_bar.addWidget(self.zoom_label)
         nav_bar.addWidget(self.reset_view_button)
 
@@ -159,11 +203,49 @@ class TypewriterConverter(QMainWindow):
         self.preview.zoomChanged.connect(self.update_zoom_label)
         self.preview.pageChanged.connect(self.update_page_label)
 
+        #Keep the editor cursor and the page in view in step
+        self.text_edit.cursorPositionChanged.connect(self.on_cursor_moved)
+        self.preview.pageClicked.connect(self.on_preview_clicked)
+
+        #Page overview goes left of the preview once the window is up
+        self.thumbnails = None
+        self.pages_layout = QHBoxLayout()
+        self.pages_layout.addWidget(self.scroll_area)
+
         right_panel.addLayout(nav_bar)
-        right_panel.addWidget(self.scroll_area)
+        right_panel.addLayout(self.pages_layout)
 
         return right_panel
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.thumbnails is None:
+            #Secondary panels are built after the first frame
+            QTimer.singleShot(0, self.create_secondary_panels)
+
+    def create_secondary_panels(self):
+        if self.thumbnails is not None:
+            return
+        self.thumbnails = ThumbnailStrip()
+        self.thumbnails.pageSelected.connect(self.preview.showPage)
+        self.preview.pageChanged.connect(self.thumbnails.showCurrentPage)
+        self.pages_layout.insertWidget(0, self.thumbnails)
+
+        #Catch up with pages rendered before the strip existed
+        self.reset_thumbnails(len(self.pages))
+        for index, page in enumerate(self.pages):
+            if page is not None:
+                self.update_thumbnail(index, page)
+        self.thumbnails.showCurrentPage(self.preview.getCurrentPage(), len(self.pages))
+
+    def reset_thumbnails(self, count):
+        if self.thumbnails is not None:
+            self.thumbnails.setPageCount(count)
+
+    def update_thumbnail(self, index, page, key=None):
+        if self.thumbnails is not None:
+            self.thumbnails.updatePage(index, page, key)
+
     def apply_styles(self):
         self.setStyleSheet("""
             QMainWindow {
@@ -201,6 +283,12 @@ class TypewriterConverter(QMainWindow):
             QLabel {
                 color: #ffffff;
             }
+            QListWidget {
+                background-color: #3d3d3d;
+                color: #ffffff;
+                border: 1px solid #555555;
+                border-radius: 4px;
+            }
             QSpinBox, QDoubleSpinBox, QComboBox {
                 background-color: #4a4a4a;
                 color: #ffffff;
@@ -212,7 +300,44 @@ class TypewriterConverter(QMainWindow):
 
     def on_text_changed(self):
         if self.typewriter_settings.auto_update.isChecked():
-            self.update_timer.start(500)  #Delay for better performance
+            self.schedule_render()
+
+    def schedule_render(self):
+        #Pages still waiting for idle time are stale now, drop them
+        self.idle_timer.stop()
+        self.quality_timer.stop()
+        self.scheduler.request()
+
+    def on_cursor_moved(self):
+        #Show the page the cursor is on, from the last layout's text index
+        index = self.pipeline.text_index
+        if index is None or self.source_file is not None:
+            return
+        cursor = self.text_edit.textCursor()
+        column = code_point_column(cursor.block().text(), cursor.positionInBlock())
+        position = index.position(index.source_offset(cursor.blockNumber(), column))
+        if position is None:
+            return
+        page = position[0]
+        if page != self.preview.current_page and page < len(self.pages):
+            self.preview.showPage(page)
+
+    def on_preview_clicked(self, page, point):
+        #Put the editor cursor on the character clicked in the preview
+        index = self.pipeline.text_index
+        if index is None or self.source_file is not None:
+            return
+        offset = index.offset_at(page, point.x(), point.y())
+        if offset is None:
+            return
+        line, column = index.source_position(offset)
+        block = self.text_edit.document().findBlockByNumber(line)
+        if not block.isValid():
+            return
+        cursor = self.text_edit.textCursor()
+        cursor.setPosition(block.position() + utf16_length(block.text()[:column]))
+        self.text_edit.setTextCursor(cursor)
+        self.text_edit.setFocus()
 
     def load_file(self):
         file_name, _ = QFileDialog.getOpenFileName(
@@ -223,212 +348,196 @@ class TypewriterConverter(QMainWindow):
         )
         if file_name:
             try:
-                with open(file_name, 'r', encoding='utf-8') as file:
-                    self.text_edit.setText(file.read())
+                if os.path.getsize(file_name) > STREAMING_THRESHOLD:
+                    self.open_manuscript(file_name)
+                else:
+                    self.close_manuscript()
+                    with open(file_name, 'r', encoding='utf-8') as file:
+                        self.text_edit.setPlainText(file.read())
             except Exception as e:
                 self.show_error_message(f"Error loading file: {str(e)}")
 
-    def setup_painter(self, painter):
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        font = self.typewriter_settings.get_font()
-        painter.setFont(font)
-
-    def create_blank_page(self, width, height):
-        page = QImage(width, height, QImage.Format.Format_RGB32)
-        page.fill(QColor('#ffffff'))  #Fill with white by default
-        return page
-
-    def convert_text(self):
-        if not self.text_edit.toPlainText():
-            return
+    def open_manuscript(self, file_name):
+        #Large files stay on disk: the editor shows a read-only window of the
+        #first lines and rendering streams the file itself
+        window = []
+        for line in read_lines(file_name):
+            window.append(line)
+            if len(window) >= EDITOR_WINDOW_LINES:
+                break
+
+        self.source_file = file_name
+        self.text_edit.blockSignals(True)
+        self.text_edit.setPlainText('\n'.join(window))
+        self.text_edit.blockSignals(False)
+        self.text_edit.setReadOnly(True)
+        self.text_edit.setToolTip(
+            f"Showing the first {len(window)} lines of {file_name}, "
+            "the full file is rendered straight from disk"
+        )
+        self.convert_text()
+
+    def close_manuscript(self):
+        self.stream_timer.stop()
+        self.source_file = None
+        self.text_edit.setReadOnly(False)
+        self.text_edit.setToolTip("")
+
+    def get_source_text(self):
+        if self.source_file is not None:
+            with open(self.source_file, 'r', encoding='utf-8') as file:
+                return file.read()
+        return self.text_edit.toPlainText()
+
+    def preview_text(self):
+        self.convert_text(draft=self.typewriter_settings.draft_preview.isChecked())
+
+    def convert_text(self, draft=False):
+        self.stream_timer.stop()
+        self.idle_timer.stop()
+        self.quality_timer.stop()
+        self.scheduler.cancel()
+        text = None
+        if self.source_file is None:
+            text = self.text_edit.toPlainText()
+            if not text:
+                return
 
         try:
-            #Get page dimensions and DPI
-            dpi = self.paper_settings.dpi.value()
-            page_width, page_height = self.paper_settings.get_page_size()
-            margin_pixels = self.paper_settings.get_margin_pixels()
-
-            #Calculate font size in pixels
-            font_size_pixels = self.typewriter_settings.get_font_size_pixels(dpi)
-
-            #Clear pages
-            self.pages = []
-            current_page = self.create_blank_page(page_width, page_height)
-            painter = QPainter(current_page)
-
-            #Set up the painter with proper font
-            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-            font = self.typewriter_settings.get_font(dpi)
-            painter.setFont(font)
-
-            y_position = margin_pixels
-            line_height = int(font_size_pixels * 1.5)  #1.5 line spacing
-            available_width = page_width - (2 * margin_pixels)
-
-            #Process text
-            lines = self.text_edit.toPlainText().split('\n')
-            for line in lines:
-                if line.strip() == PAGE_BREAK_MARKER:
-                    #Finish the current page and start a new one
-                    painter.end()
-                    self.pages.append(current_page)
-                    current_page = self.create_blank_page(page_width, page_height)
-                    painter = QPainter(current_page)
-                    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-                    painter.setFont(font)
-                    y_position = margin_pixels
-                    continue
-
-                words = line.split(' ')
-                current_line = ''
-                for word in words:
-                    test_line = current_line + word + ' '
-                    if painter.fontMetrics().horizontalAdvance(test_line) > available_width:
-                        #Draw the current line and start a new one
-                        self.draw_line(painter, current_line, margin_pixels, y_position)
-                        y_position += line_height
-                        current_line = word + ' '
-                        if y_position + line_height > page_height - margin_pixels:
-                            #Finish the current page and start a new one
-                            painter.end()
-                            self.pages.append(current_page)
-                            current_page = self.create_blank_page(page_width, page_height)
-                            painter = QPainter(current_page)
-                            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-                            painter.setFont(font)
-                            y_position = margin_pixels
-                    else:
-                        current_line = test_line
-                #Draw the last line
-                self.draw_line(painter, current_line, margin_pixels, y_position)
-                y_position += line_height
-                if y_position + line_height > page_height - margin_pixels:
-                    #Finish the current page and start a new one
-                    painter.end()
-                    self.pages.append(current_page)
-                    current_page = self.create_blank_page(page_width, page_height)
-                    painter = QPainter(current_page)
-                    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-                    painter.setFont(font)
-                    y_position = margin_pixels
-
-            #Add the final page
-            painter.end()
-            self.pages.append(current_page)
+            settings = RenderSettings.from_widgets(self.paper_settings, self.typewriter_settings)
+
+            if text is None:
+                #Streamed manuscripts are rendered a page per event loop turn,
+                #pages show up in the preview as the lines arrive
+                self.pipeline.reset()
+                self.pages = self.create_page_store()
+                self.pending_pages = []
+                self.draft_pages = set()
+                self.preview.setPages(self.pages)
+                self.reset_thumbnails(0)
+                renderer = PageRenderer(settings, self.render_seed)
+                self.page_stream = renderer.render_pages(read_lines(self.source_file))
+                self.stream_timer.start(0)
+                return
+
+            self.scheduler.begin()
+            dirty = self.pipeline.update(text.split('\n'), settings)
+            if not dirty:
+                self.scheduler.end()
+                return
+            count = self.pipeline.page_count()
+            if len(dirty) == count:
+                self.pages = self.create_page_store([None] * count)
+            else:
+                #Unchanged pages keep their images, changed ones are redone below
+                self.pages.resize(count)
+            self.reset_thumbnails(count)
+
+            #Render the page in view now, the others nearest first when idle.
+            #Pages an earlier update left waiting are still stale, the
+            #pipeline only reports what changed since then, so they stay queued.
+            #Drafts are always redone at full quality, the page in view first
+            self.draft_pages = {i for i in self.draft_pages if i < count}
+            waiting = {i for i in self.pending_pages if i < count} | set(dirty) | self.draft_pages
+            visible = min(self.preview.current_page, count - 1)
+            if visible in waiting:
+                self.render_layout_page(visible, draft)
+            self.pending_pages = sorted(
+                (i for i in waiting if i != visible),
+                key=lambda i: abs(i - visible),
+                reverse=True
+            )
+            if visible in self.draft_pages:
+                self.pending_pages.append(visible)
 
             #Update preview
-            self.preview.setPages(self.pages)
+            self.preview.setPages(self.pages, visible)
             self.update_page_label()
+            self.scheduler.end()
+            if self.pending_pages and draft:
+                #Full quality waits for a pause, typing only ever pays for drafts
+                self.quality_timer.start(FULL_QUALITY_DELAY)
+            elif self.pending_pages:
+                self.idle_timer.start(0)
 
         except Exception as e:
             self.show_error_message(f"Error converting text: {str(e)}")
 
-    def on_settings_changed(self):
-        if self.typewriter_settings.auto_update.isChecked():
-            self.update_timer.start(200)
-
-    def generate_ink_effects(self, effect_scale):
-        effects = []
-        for _ in range(random.randint(1, 3)):
-            dx = random.uniform(-2, 2) * effect_scale
-            dy = random.uniform(-2, 2) * effect_scale
-            alpha = random.uniform(0.1, 0.3)
-            effects.append((dx, dy, alpha))
-        return effects
-
-    def draw_line(self, painter, text, x, y):
-        settings = self.typewriter_settings
-        baseline = y + painter.fontMetrics().ascent()
-        effect_scale = settings.get_effect_scale(self.paper_settings.get_dpi())
-
-        for char in text:
-            #Calculate variations
-            darkness = random.uniform(
-                1.0 - settings.darkness_variation.value(),
-                1.0
-            )
-            v_offset = random.uniform(
-                -settings.vertical_misalignment.value() * effect_scale,
-                settings.vertical_misalignment.value() * effect_scale
-            )
-
-            #Draw main character
-            color = QColor(0, 0, 0)
-            color.setAlphaF(darkness)
-            pen = QPen(color)
-            pen.setWidthF(effect_scale)  #Scale pen width with font size
-            painter.setPen(pen)
-
-            char_x = x + random.uniform(-0.5, 0.5) * effect_scale
-            painter.drawText(int(char_x), int(baseline + v_offset), char)
-
-            #Add ink effects
-            if settings.ink_splatter.isChecked() and random.random() < settings.ink_effect_prob.value():
-                self.apply_ink_effects(painter, char_x, baseline + v_offset, char, darkness, effect_scale)
+    def create_page_store(self, pages=()):
+        budget = self.typewriter_settings.get_memory_budget()
+        return PageStore(pages, budget - int(budget * RASTER_SHARE))
+
+    def on_memory_budget_changed(self):
+        #Finished pages share the memory budget with the pipeline's rasters
+        budget = self.typewriter_settings.get_memory_budget()
+        self.pages.set_budget(budget - int(budget * RASTER_SHARE))
+        self.pipeline.set_budget(int(budget * RASTER_SHARE))
+
+    def render_layout_page(self, index, draft=False):
+        page = self.pipeline.render(index, draft)
+        self.pages[index] = page
+        if draft:
+            self.draft_pages.add(index)
+        else:
+            self.draft_pages.discard(index)
+            self.update_thumbnail(index, page, self.pipeline.page_key(index))
 
-            #Move to next character position
-            x += painter.fontMetrics().horizontalAdvance(char) + random.uniform(
-                -settings.char_spacing.value() * effect_scale,
-                settings.char_spacing.value() * effect_scale
-            )
+    def render_idle_page(self):
+        if not self.pending_pages:
+            self.idle_timer.stop()
+            return
+        index = self.pending_pages.pop()
+        try:
+            self.render_layout_page(index)
+        except Exception as e:
+            self.idle_timer.stop()
+            self.show_error_message(f"Error converting text: {str(e)}")
+            return
+        self.preview.pageUpdated(index)
+
+    def finish_rendering(self):
+        #Export and save always get every page at full quality
+        if self.scheduler.isPending():
+            self.convert_text()
+        if self.stream_timer.isActive():
+            #A manuscript still streaming is rendered to its last page first
+            self.stream_timer.stop()
+            for page in self.page_stream:
+                self.pages.append(page)
+                self.update_thumbnail(len(self.pages) - 1, page)
+            self.preview.pagesAppended()
+        while self.pending_pages:
+            self.render_layout_page(self.pending_pages.pop())
+        for index in sorted(self.draft_pages):
+            self.render_layout_page(index)
+        self.idle_timer.stop()
+        self.quality_timer.stop()
+
+    def render_next_page(self):
+        try:
+            page = next(self.page_stream, None)
+        except Exception as e:
+            self.stream_timer.stop()
+            self.show_error_message(f"Error converting text: {str(e)}")
+            return
 
-    def generate_ink_splatter(self, x, y, scale):
-        splatter = []
-        #Generate random dots around the point
-        for _ in range(random.randint(3, 8)):
-            dx = random.gauss(0, 2) * scale
-            dy = random.gauss(0, 2) * scale
-            size = random.uniform(0.5, 2) * scale
-            alpha = random.uniform(0.1, 0.4)
-            splatter.append((x + dx, y + dy, size, alpha))
-        return splatter
-
-    def draw_ink_splatter(self, painter, splatter):
-        original_pen = painter.pen()
-        for x, y, size, alpha in splatter:
-            color = QColor(0, 0, 0)
-            color.setAlphaF(alpha)
-            painter.setPen(QPen(color, size, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap))
-            painter.drawPoint(int(x), int(y))
-        painter.setPen(original_pen)
-
-    def apply_ink_effects(self, painter, x, y, char, darkness, effect_scale):
-        #Original character with varying pressure
-        pressure_variations = [
-            (0.2, -0.5, -0.5),
-            (0.3, 0.5, 0.5),
-            (0.4, -0.3, 0.3)
-        ]
-
-        for alpha_mod, dx_mod, dy_mod in pressure_variations:
-            color = QColor(0, 0, 0)
-            color.setAlphaF(darkness * alpha_mod)
-            dx = dx_mod * effect_scale
-            dy = dy_mod * effect_scale
-            painter.setPen(QPen(color, effect_scale * 0.8))
-            painter.drawText(int(x + dx), int(y + dy), char)
-
-        #Add ink bleeding effect
-        if random.random() < 0.3:
-            bleed_points = random.randint(2, 5)
-            for _ in range(bleed_points):
-                dx = random.gauss(0, 1) * effect_scale
-                dy = random.gauss(0, 1) * effect_scale
-                color = QColor(0, 0, 0)
-                color.setAlphaF(darkness * random.uniform(0.1, 0.3))
-                painter.setPen(QPen(color, effect_scale * 0.5))
-                painter.drawText(int(x + dx), int(y + dy), char)
-
-        #Add ink splatters
-        if random.random() < 0.2:
-            splatter = self.generate_ink_splatter(x, y, effect_scale)
-            self.draw_ink_splatter(painter, splatter)
-
-    def finish_page(self, painter, page):
-        painter.end()
+        if page is None:
+            self.stream_timer.stop()
+            return
         self.pages.append(page)
+        self.preview.pagesAppended()
+        self.update_thumbnail(len(self.pages) - 1, page)
+
+    def on_settings_changed(self):
+        if self.typewriter_settings.auto_update.isChecked():
+            self.schedule_render()
 
     def save_image(self):
+        try:
+            self.finish_rendering()
+        except Exception as e:
+            self.show_error_message(f"Error converting text: {str(e)}")
+            return
         if not self.pages:
             self.show_error_message("No pages to save!")
             return
@@ -437,24 +546,47 @@ class TypewriterConverter(QMainWindow):
             self,
             "Save Document",
             "",
-            "PDF Document (*.pdf);;PNG Images (*.png)"
+            ";;".join(EXPORT_FILTERS)
         )
 
         if not file_name:
             return
 
+        extension = EXPORT_FILTERS.get(selected_filter, '.pdf')
+        if not file_name.lower().endswith(extension):
+            file_name += extension
+
         try:
-            if selected_filter == "PDF Document (*.pdf)":
-                self.save_as_images(file_name) #changed to save as pdf always..!
-            else:
-                self.save_as_images(file_name)
+            self.export_pages(file_name)
         except Exception as e:
             self.show_error_message(f"Error saving file: {str(e)}")
 
+    def export_pages(self, file_name):
+        from export import IncrementalExport, get_profile
+
+        #Pages are encoded in the chosen profile one at a time as they are
+        #written. Exporting to the same file again only encodes the pages
+        #that changed, known by their render keys while the pipeline has them
+        settings = RenderSettings.from_widgets(self.paper_settings, self.typewriter_settings)
+        profile = get_profile(*self.export_settings.get_profile_options())
+        if self.exporter is None:
+            self.exporter = IncrementalExport()
+        keys = None
+        if self.source_file is None and self.pipeline.page_count() == len(self.pages):
+            keys = [self.pipeline.page_key(index) for index in range(len(self.pages))]
+        encoded = self.exporter.export(file_name, self.pages, settings, profile, keys)
+
+        message = f"Saved {len(self.pages)} pages to {file_name}"
+        if encoded < len(self.pages):
+            message += f" ({encoded} changed)"
+        self.show_success_message(message)
+
     def save_as_pdf(self, file_name):
         if not file_name.lower().endswith('.pdf'):
             file_name += '.pdf'
 
+        from PyQt6.QtPrintSupport import QPrinter
+
         printer = QPrinter(QPrinter.PrinterMode.HighResolution)
         printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
         printer.setOutputFileName(file_name)
@@ -481,28 +613,6 @@ class TypewriterConverter(QMainWindow):
 
         self.show_success_message(f"PDF saved successfully to {file_name}")
 
-    def save_as_images(self, file_name):
-        base, ext = os.path.splitext(file_name)
-        if not ext.lower() == '.png':
-            ext = '.png'
-
-        image_files = []
-        for i, page in enumerate(self.pages):
-            page_file = f"{base}_page_{i + 1}{ext}"
-            page.save(page_file)
-            image_files.append(page_file)
-
-        self.convert_images_to_pdf(image_files, f"{base}.pdf")
-        self.show_success_message(f"Saved {len(self.pages)} pages as PNG images and converted to PDF")
-
-    def convert_images_to_pdf(self, image_files, pdf_file):
-        c = canvas.Canvas(pdf_file, pagesize=letter)
-        for image_file in image_files:
-            image = Image.open(image_file)
-            c.drawImage(image_file, 0, 0, width=letter[0], height=letter[1])
-            c.showPage()
-        c.save()
-
     def save_project(self):
         file_name, _ = QFileDialog.getSaveFileName(
             self,
@@ -518,8 +628,11 @@ class TypewriterConverter(QMainWindow):
             file_name += '.typy'
 
         try:
+            from project import write_project
+
+            self.finish_rendering()
             project_data = {
-                'text': self.text_edit.toPlainText(),
+                'text': self.get_source_text(),
                 'paper_settings': {
                     'paper_size': self.paper_settings.paper_size.currentText(),
                     'dpi': self.paper_settings.dpi.value(),
@@ -532,24 +645,14 @@ class TypewriterConverter(QMainWindow):
                     'char_spacing': self.typewriter_settings.char_spacing.value(),
                     'ink_splatter': self.typewriter_settings.ink_splatter.isChecked(),
                     'ink_fade': self.typewriter_settings.ink_fade.isChecked(),
-                    'ink_effect_prob': self.typewriter_settings.ink_effect_prob.value()
+                    'ink_effect_prob': self.typewriter_settings.ink_effect_prob.value(),
+                    'ink_engine': self.typewriter_settings.ink_engine.currentText()
                 },
                 'pages': []
             }
 
             #Save rendered pages as base64 encoded PNG
-            for page in self.pages:
-                #Convert QImage to bytes
-                byte_array = QByteArray()
-                buffer = QBuffer(byte_array)
-                buffer.open(QBuffer.OpenModeFlag.WriteOnly)
-                page.save(buffer, "PNG")
-                #Convert to base64 and store
-                page_data = base64.b64encode(byte_array.data()).decode()
-                project_data['pages'].append(page_data)
-
-            with open(file_name, 'w') as f:
-                json.dump(project_data, f)
+            write_project(file_name, project_data, self.pages)
 
             self.show_success_message(f"Project saved successfully to {file_name}")
 
@@ -568,10 +671,12 @@ class TypewriterConverter(QMainWindow):
             return
 
         try:
-            with open(file_name, 'r') as f:
-                project_data = json.load(f)
+            from project import read_project, decode_page
+
+            project_data = read_project(file_name)
 
             #Restore text
+            self.close_manuscript()
             self.text_edit.setPlainText(project_data['text'])
 
             #Restore paper settings
@@ -589,15 +694,20 @@ class TypewriterConverter(QMainWindow):
             self.typewriter_settings.ink_splatter.setChecked(tw_settings['ink_splatter'])
             self.typewriter_settings.ink_fade.setChecked(tw_settings['ink_fade'])
             self.typewriter_settings.ink_effect_prob.setValue(tw_settings['ink_effect_prob'])
+            self.typewriter_settings.ink_engine.setCurrentText(tw_settings.get('ink_engine', 'classic'))
 
             #Restore pages
-            self.pages = []
+            self.pipeline.reset()
+            self.idle_timer.stop()
+            self.quality_timer.stop()
+            self.pending_pages = []
+            self.draft_pages = set()
+            self.pages = self.create_page_store()
+            self.reset_thumbnails(0)
             for page_data in project_data['pages']:
-                #Convert base64 back to QImage
-                byte_array = QByteArray.fromBase64(page_data.encode())
-                image = QImage()
-                image.loadFromData(byte_array, "PNG")
+                image = decode_page(page_data)
                 self.pages.append(image)
+                self.update_thumbnail(len(self.pages) - 1, image)
 
             #Update preview
             self.preview.setPages(self.pages)
@@ -647,15 +757,11 @@ class TypewriterConverter(QMainWindow):
         elif event.key() == Qt.Key.Key_Right:
             self.next_page()
         elif event.modifiers() == Qt.KeyboardModifier.ControlModifier:
+            #Through setZoom, so continuous view is laid out again and the label follows
             if event.key() == Qt.Key.Key_Plus:
-                self.preview.zoom *= 1.1
-                self.preview.update()
-                self.update_zoom_label(self.preview.zoom)
+                self.preview.setZoom(self.preview.zoom * 1.1)
             elif event.key() == Qt.Key.Key_Minus:
-                self.preview.zoom /= 1.1
-                self.preview.zoom = max(0.1, self.preview.zoom)
-                self.preview.update()
-                self.update_zoom_label(self.preview.zoom)
+                self.preview.setZoom(self.preview.zoom / 1.1)
             elif event.key() == Qt.Key.Key_0:
                 self.reset_view()
         super().keyPressEvent(event)
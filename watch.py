@@ -0,0 +1,116 @@
+import os
+import time
+import random
+
+from render import RenderSettings
+from pagestore import PageStore, DEFAULT_BUDGET
+from pipeline import RenderPipeline
+from export import IncrementalExport
+from project import read_project
+
+#How often the watched files are checked for changes
+POLL_INTERVAL = 0.5  #seconds
+#Files must stay unchanged this long before rendering, so a burst of saves
+#or an editor writing in several steps costs a single render
+SETTLE_TIME = 0.3  #seconds
+#Part of the memory budget for the pipeline's rasters, as in the window
+RASTER_SHARE = 0.25
+
+
+def file_state(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None  #Editors saving by rename may briefly remove the file
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class DocumentWatcher:
+    #Keeps an output file rendered from a text file or .typy project. Polls
+    #the source and settings files; every change runs through the same
+    #staged pipeline as the live preview, so only pages whose text or
+    #settings changed are rendered again and encoded into the output again,
+    #see IncrementalExport. The output is only ever replaced by renaming a
+    #finished file over it, readers never see it half written
+
+    def __init__(self, input_file, output, settings_file=None, profile=None, budget=DEFAULT_BUDGET):
+        self.input_file = input_file
+        self.output = output
+        self.settings_file = settings_file
+        self.profile = profile
+        #Same jitter on every re-render, unchanged pages stay identical
+        self.pipeline = RenderPipeline(random.getrandbits(32), int(budget * RASTER_SHARE))
+        self.pages = PageStore(budget=budget - int(budget * RASTER_SHARE))
+        self.exporter = IncrementalExport()
+
+    def watched_files(self):
+        return [path for path in (self.input_file, self.settings_file) if path]
+
+    def states(self):
+        return [file_state(path) for path in self.watched_files()]
+
+    def load(self):
+        settings = RenderSettings()
+        if self.settings_file:
+            settings = RenderSettings.from_project(read_project(self.settings_file))
+        if self.input_file.endswith('.typy'):
+            project_data = read_project(self.input_file)
+            if not self.settings_file:
+                settings = RenderSettings.from_project(project_data)
+            return project_data['text'].split('\n'), settings
+        with open(self.input_file, 'r', encoding='utf-8') as file:
+            return file.read().split('\n'), settings
+
+    def update(self):
+        #Render what changed and update the output, returns the pages
+        #rendered and how many were encoded into the output
+        lines, settings = self.load()
+        dirty = self.pipeline.update(lines, settings)
+        if not dirty and os.path.exists(self.output):
+            return [], 0
+        count = self.pipeline.page_count()
+        self.pages.resize(count)
+        for index in dirty:
+            self.pages[index] = self.pipeline.render(index)
+        return dirty, self.write(settings)
+
+    def write(self, settings):
+        #Only pages whose render key changed are encoded again, on a copy of
+        #the output or into a new file that is then renamed over it
+        keys = [self.pipeline.page_key(index) for index in range(len(self.pages))]
+        return self.exporter.export(self.output, self.pages, settings, self.profile, keys, atomic=True)
+
+    def render(self):
+        started = time.perf_counter()
+        try:
+            dirty, encoded = self.update()
+        except Exception as e:
+            #Half saved or invalid source, keep the last output and wait for
+            #the next save, which renders everything again
+            self.pipeline.reset()
+            print(f"Error rendering {self.input_file}: {str(e)}", flush=True)
+            return
+        if dirty:
+            elapsed = time.perf_counter() - started
+            print(f"Saved {len(self.pages)} pages to {self.output} "
+                  f"({len(dirty)} rendered, {encoded} encoded in {elapsed:.2f}s)", flush=True)
+
+    def run(self):
+        states = self.states()
+        self.render()
+        print(f"Watching {', '.join(self.watched_files())}, Ctrl+C to stop", flush=True)
+        while True:
+            time.sleep(POLL_INTERVAL)
+            current = self.states()
+            if current == states:
+                continue
+            #Wait for the files to settle before rendering
+            while True:
+                time.sleep(SETTLE_TIME)
+                settled = self.states()
+                if settled == current:
+                    break
+                current = settled
+            states = current
+            if None not in states:
+                self.render()
@@ -1,23 +1,35 @@
 
+import bisect
+
 from PyQt6.QtWidgets import (
     QWidget, QPushButton, QGroupBox,
     QFormLayout, QSpinBox, QDoubleSpinBox,
-    QCheckBox, QComboBox, QPinchGesture
+    QCheckBox, QComboBox, QPinchGesture,
+    QAbstractScrollArea, QListWidget, QListWidgetItem, QListView
 )
 
 from PyQt6.QtGui import (
-    QFont, QPainter, QColor)
+    QFont, QPainter, QColor, QImage, QIcon, QPixmap)
 
 from PyQt6.QtCore import (
-    Qt, QRect, pyqtSignal,
-    QEvent)
-
+    Qt, QRect, QSize, QPointF, pyqtSignal,
+    QEvent, QObject, QRunnable, QThreadPool)
 
-PAGE_BREAK_MARKER = '!pb'
+from render import PAPER_SIZES
+from pagestore import DEFAULT_BUDGET
 
 class ScrollableImage(QWidget):
     zoomChanged = pyqtSignal(float)
     pageChanged = pyqtSignal(int, int)
+    #Page index and the clicked point in page pixels
+    pageClicked = pyqtSignal(int, QPointF)
+
+    #Continuous mode: space around pages and how far beyond the viewport
+    #pages are scaled ahead of being scrolled into view
+    PAGE_GAP = 20
+    PRELOAD_MARGIN = 400  #px
+    #A press released within this distance is a click rather than a pan
+    CLICK_DISTANCE = 4  #px
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -27,6 +39,14 @@ class ScrollableImage(QWidget):
         self.current_page = 0
         self.shadow_offset = 5
 
+        #Continuous vertical scroll through all pages instead of one at a time
+        self.continuous = False
+        self.page_tops = []
+        self.default_size = None
+
+        #Pages scaled to the current zoom, only kept for pages near the view
+        self.scaled_pages = {}
+
         #Track pinch gestures
         self.grabGesture(Qt.GestureType.PinchGesture)
 
@@ -37,51 +57,187 @@ class ScrollableImage(QWidget):
         self.offset_x = 0
         self.offset_y = 0
         self.last_pos = None
+        self.press_pos = None
         self.panning = False
 
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = event.rect()
 
-        #Draw checkered background
+        #Draw checkered background, only where it is exposed
         bg_size = 20
-        for x in range(0, self.width(), bg_size):
-            for y in range(0, self.height(), bg_size):
+        for x in range(rect.left() - rect.left() % bg_size, rect.right() + 1, bg_size):
+            for y in range(rect.top() - rect.top() % bg_size, rect.bottom() + 1, bg_size):
                 if (x // bg_size + y // bg_size) % 2:
                     painter.fillRect(x, y, bg_size, bg_size, QColor('#8c5d3b'))
                 else:
                     painter.fillRect(x, y, bg_size, bg_size, QColor('#764428'))
 
-        if self.pages and self.current_page < len(self.pages):
-            current_image = self.pages[self.current_page]
-            paper_width = int(current_image.width() * self.zoom)
-            paper_height = int(current_image.height() * self.zoom)
-
-            #Center position with offset
-            x = int((self.width() - paper_width) // 2 + self.offset_x)
-            y = int((self.height() - paper_height) // 2 + self.offset_y)
-
-            #Draw shadow
-            shadow_rect = QRect(
-                x + self.shadow_offset,
-                y + self.shadow_offset,
-                paper_width,
-                paper_height
-            )
-            painter.fillRect(shadow_rect, QColor(0, 0, 0, 50))
-
-            #Draw paper
-            paper_rect = QRect(x, y, paper_width, paper_height)
-            painter.fillRect(paper_rect, QColor('#ffffff'))
-
-            #Draw content
+        if self.continuous:
+            #Only pages near the exposed area are scaled, the rest are never touched
+            first, last = self.pagesAround(rect)
+            for index in range(first, last):
+                self.drawPage(painter, index)
+            visible_first, visible_last = self.pagesAround(self.visibleRegion().boundingRect())
+            self.pruneScaled(visible_first, visible_last)
+        elif self.pages and self.current_page < len(self.pages):
+            self.drawPage(painter, self.current_page)
+            self.pruneScaled(self.current_page, self.current_page + 1)
+
+    def drawPage(self, painter, index):
+        paper_rect = self.pageRect(index)
+
+        #Draw shadow
+        painter.fillRect(paper_rect.translated(self.shadow_offset, self.shadow_offset), QColor(0, 0, 0, 50))
+
+        #Draw paper
+        painter.fillRect(paper_rect, QColor('#ffffff'))
+
+        #Draw content, pages still being rendered stay blank
+        scaled_image = self.scaledPage(index, paper_rect.width(), paper_rect.height())
+        if scaled_image is not None:
+            painter.drawImage(paper_rect.x(), paper_rect.y(), scaled_image)
+
+    def scaledPage(self, index, paper_width, paper_height):
+        scaled_image = self.scaled_pages.get(index)
+        if scaled_image is None or scaled_image.size() != QSize(paper_width, paper_height):
+            current_image = self.pages[index]
+            if current_image is None:
+                return None
             scaled_image = current_image.scaled(
                 paper_width,
                 paper_height,
-                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.AspectRatioMode.IgnoreAspectRatio,
                 Qt.TransformationMode.SmoothTransformation
             )
-            painter.drawImage(x, y, scaled_image)
+            self.scaled_pages[index] = scaled_image
+        return scaled_image
+
+    def pruneScaled(self, first, last):
+        for index in list(self.scaled_pages):
+            if not first <= index < last:
+                del self.scaled_pages[index]
+
+    def pageRect(self, index):
+        page_width, page_height = self.pageSize(index)
+        paper_width = int(page_width * self.zoom)
+        paper_height = int(page_height * self.zoom)
+
+        if self.continuous:
+            x = (self.width() - paper_width) // 2
+            return QRect(x, self.page_tops[index], paper_width, paper_height)
+
+        #Center position with offset
+        x = int((self.width() - paper_width) // 2 + self.offset_x)
+        y = int((self.height() - paper_height) // 2 + self.offset_y)
+        return QRect(x, y, paper_width, paper_height)
+
+    def pageAt(self, pos):
+        #(index, point in page pixels) of the page under pos, or None
+        if not self.pages:
+            return None
+        if self.continuous:
+            index = max(0, bisect.bisect_right(self.page_tops, int(pos.y())) - 1)
+        else:
+            index = self.current_page
+        rect = self.pageRect(index)
+        if not rect.contains(pos.toPoint()):
+            return None
+        page_width, page_height = self.pageSize(index)
+        return (index, QPointF((pos.x() - rect.x()) * page_width / rect.width(),
+                               (pos.y() - rect.y()) * page_height / rect.height()))
+
+    def pagesAround(self, rect):
+        #Range of pages intersecting rect, widened by the preload margin
+        top = rect.top() - self.PRELOAD_MARGIN
+        bottom = rect.bottom() + self.PRELOAD_MARGIN
+        first = max(0, bisect.bisect_right(self.page_tops, top) - 1)
+        last = bisect.bisect_right(self.page_tops, bottom)
+        return (first, last)
+
+    def layoutPages(self):
+        #Stack the pages and size the widget so the scroll area scrolls over
+        #all of them, from known page sizes without loading any page
+        self.page_tops = []
+        y = self.PAGE_GAP
+        width = 0
+        for index in range(len(self.pages)):
+            page_width, page_height = self.pageSize(index)
+            self.page_tops.append(y)
+            y += int(page_height * self.zoom) + self.PAGE_GAP
+            width = max(width, int(page_width * self.zoom))
+        self.setMinimumSize(width + 2 * self.PAGE_GAP, y)
+
+    def setContinuous(self, continuous):
+        self.continuous = continuous
+        self.scaled_pages = {}
+        if continuous:
+            current_page = self.current_page
+            self.layoutPages()
+            self.scrollToPage(current_page)
+        else:
+            self.page_tops = []
+            self.setMinimumSize(600, 800)
+            self.offset_x = 0
+            self.offset_y = 0
+        self.update()
+
+    def scrollArea(self):
+        widget = self.parentWidget()
+        while widget is not None and not isinstance(widget, QAbstractScrollArea):
+            widget = widget.parentWidget()
+        return widget
+
+    def scrollToPage(self, index):
+        area = self.scrollArea()
+        if area is None or not self.page_tops:
+            return
+        area.verticalScrollBar().setValue(self.page_tops[index] - self.PAGE_GAP)
+        self.setCurrentPage(index)
+
+    def scrollBy(self, dx, dy):
+        area = self.scrollArea()
+        if area is not None:
+            area.horizontalScrollBar().setValue(area.horizontalScrollBar().value() - int(dx))
+            area.verticalScrollBar().setValue(area.verticalScrollBar().value() - int(dy))
+
+    def moveEvent(self, event):
+        #The scroll area scrolls by moving this widget, track the page in view
+        super().moveEvent(event)
+        if self.continuous and self.page_tops and self.parentWidget() is not None:
+            center = -self.y() + self.parentWidget().height() // 2
+            self.setCurrentPage(max(0, bisect.bisect_right(self.page_tops, center) - 1))
+
+    def setCurrentPage(self, index):
+        if index != self.current_page:
+            self.current_page = index
+            self.pageChanged.emit(self.current_page + 1, len(self.pages))
+
+    def setZoom(self, zoom, anchor=None):
+        #Zoom towards anchor, a point in widget coordinates. Without one a
+        #single page scales around its centre and continuous view around the
+        #middle of what is in view
+        old_zoom = self.zoom
+        self.zoom = max(0.1, min(5.0, zoom))
+        zoom_factor = self.zoom / old_zoom
+
+        if self.continuous:
+            if anchor is None:
+                anchor = QPointF(self.width() / 2, -self.y() + (self.parentWidget() or self).height() / 2)
+            #Relayout, then scroll so the point under the anchor stays put
+            self.layoutPages()
+            self.scrollBy(anchor.x() - anchor.x() * zoom_factor, anchor.y() - anchor.y() * zoom_factor)
+        elif anchor is not None:
+            #The offsets move the page from the widget centre, so measure the
+            #anchor from there too
+            x = anchor.x() - self.width() / 2
+            y = anchor.y() - self.height() / 2
+            self.offset_x = x - (x - self.offset_x) * zoom_factor
+            self.offset_y = y - (y - self.offset_y) * zoom_factor
+
+        self.zoomChanged.emit(self.zoom)
+        self.update()
 
     def event(self, event):
         if event.type() == QEvent.Type.Gesture:
@@ -93,36 +249,78 @@ class ScrollableImage(QWidget):
         if pinch:
             center = pinch.centerPoint().toPoint()
             if pinch.changeFlags() & QPinchGesture.ChangeFlag.ScaleFactorChanged:
-                old_zoom = self.zoom
-                self.zoom *= pinch.scaleFactor()
-                self.zoom = max(0.1, min(5.0, self.zoom))
-
                 #Adjust offset to zoom towards gesture center
-                zoom_factor = self.zoom / old_zoom
-                self.offset_x = center.x() - (center.x() - self.offset_x) * zoom_factor
-                self.offset_y = center.y() - (center.y() - self.offset_y) * zoom_factor
-
-                self.zoomChanged.emit(self.zoom)
-                self.update()
+                self.setZoom(self.zoom * pinch.scaleFactor(), QPointF(center))
             return True
         return False
 
-    def setPages(self, pages):
+    def setPages(self, pages, current_page=0):
+        #Pages that are not rendered yet are None and show as blank paper
         self.pages = pages
-        self.current_page = 0
-        self.offset_x = 0
-        self.offset_y = 0
+        self.scaled_pages = {}
+        self.default_size = None
+        if current_page == 0 or current_page >= len(pages):
+            self.current_page = 0
+            self.offset_x = 0
+            self.offset_y = 0
+        else:
+            self.current_page = current_page
+        if self.continuous:
+            self.layoutPages()
+            if self.current_page == 0:
+                self.scrollToPage(0)
         self.update()
         self.pageChanged.emit(self.current_page + 1, len(self.pages))
 
+    def pagesAppended(self):
+        #The page list grew in place, keep the view where it is
+        if self.continuous:
+            self.layoutPages()
+            self.update()
+        elif len(self.pages) == 1:
+            self.update()
+        self.pageChanged.emit(self.current_page + 1, len(self.pages))
+
+    def pageUpdated(self, index):
+        #A pending page finished rendering
+        self.scaled_pages.pop(index, None)
+        if self.continuous or index == self.current_page:
+            self.update(self.pageRect(index))
+
         #Add these missing methods
 
+    def showPage(self, index):
+        if self.continuous:
+            self.scrollToPage(index)
+        else:
+            self.setCurrentPage(index)
+            self.update()
+
+    def pageSize(self, index):
+        #Size of a page, or of a rendered neighbour while it is still pending.
+        #Asks the page store, so no page has to be loaded for it
+        size = self.pages.size(index)
+        if size is not None:
+            return size
+        if self.default_size is None:
+            self.default_size = next((self.pages.size(i) for i in range(len(self.pages))
+                                      if self.pages.size(i) is not None), None)
+        return self.default_size or (1, 1)
+
     def fit_to_screen(self):
         if not self.pages:
             return
-        current_image = self.pages[self.current_page]
-        paper_width = current_image.width()
-        paper_height = current_image.height()
+        paper_width, paper_height = self.pageSize(self.current_page)
+        if self.continuous:
+            #Fit the page width to the viewport, scrolling covers the height
+            available_width = (self.parentWidget() or self).width() - 2 * self.PAGE_GAP
+            current_page = self.current_page
+            self.zoom = max(0.1, min(5.0, available_width / paper_width))
+            self.layoutPages()
+            self.scrollToPage(current_page)
+            self.update()
+            self.zoomChanged.emit(self.zoom)
+            return
         available_width = self.width()
         available_height = self.height()
         self.zoom = min(available_width / paper_width, available_height / paper_height)
@@ -139,30 +337,19 @@ class ScrollableImage(QWidget):
         self.zoom = 1.0
         self.offset_x = 0
         self.offset_y = 0
+        if self.continuous:
+            self.layoutPages()
         self.update()
 
     def wheelEvent(self, event):
         if event.modifiers() == Qt.KeyboardModifier.ControlModifier:
             delta = event.angleDelta().y()
-            old_zoom = self.zoom
 
+            #Adjust offset to zoom towards mouse position
             if delta > 0:
-                self.zoom *= 1.1
+                self.setZoom(self.zoom * 1.1, event.position())
             else:
-                self.zoom /= 1.1
-
-            self.zoom = max(0.1, min(5.0, self.zoom))
-
-            #Adjust offset to zoom towards mouse position
-            zoom_factor = self.zoom / old_zoom
-            mouse_x = event.position().x()
-            mouse_y = event.position().y()
-
-            self.offset_x = mouse_x - (mouse_x - self.offset_x) * zoom_factor
-            self.offset_y = mouse_y - (mouse_y - self.offset_y) * zoom_factor
-
-            self.zoomChanged.emit(self.zoom)
-            self.update()
+                self.setZoom(self.zoom / 1.1, event.position())
             event.accept()
         else:
             event.ignore()
@@ -170,30 +357,49 @@ class ScrollableImage(QWidget):
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self.panning = True
-            self.last_pos = event.position()
+            self.last_pos = event.globalPosition()
+            self.press_pos = event.globalPosition()
             self.setCursor(Qt.CursorShape.ClosedHandCursor)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self.panning = False
             self.setCursor(Qt.CursorShape.ArrowCursor)
+            if self.press_pos is None:
+                return
+            moved = event.globalPosition() - self.press_pos
+            self.press_pos = None
+            if moved.manhattanLength() <= self.CLICK_DISTANCE:
+                hit = self.pageAt(event.position())
+                if hit is not None:
+                    self.pageClicked.emit(*hit)
 
     def mouseMoveEvent(self, event):
         if self.panning and self.last_pos is not None:
-            delta = event.position() - self.last_pos
+            #Global position, the widget itself moves while the scroll area pans
+            delta = event.globalPosition() - self.last_pos
+            self.last_pos = event.globalPosition()
+            if self.continuous:
+                self.scrollBy(delta.x(), delta.y())
+                return
             self.offset_x += delta.x()
             self.offset_y += delta.y()
-            self.last_pos = event.position()
             self.update()
 
     def nextPage(self):
         if self.current_page < len(self.pages) - 1:
+            if self.continuous:
+                self.scrollToPage(self.current_page + 1)
+                return
             self.current_page += 1
             self.pageChanged.emit(self.current_page + 1, len(self.pages))
             self.update()
 
     def previousPage(self):
         if self.current_page > 0:
+            if self.continuous:
+                self.scrollToPage(self.current_page - 1)
+                return
             self.current_page -= 1
             self.pageChanged.emit(self.current_page + 1, len(self.pages))
             self.update()
@@ -202,14 +408,7 @@ class ScrollableImage(QWidget):
 class PaperSettings(QGroupBox):
     settingsChanged = pyqtSignal()
 
-    PAPER_SIZES = {
-        "a4": (210, 297),  #mm
-        "letter": (216, 279),
-        "a5": (148, 210),
-        "b5": (176, 250),
-        "legal": (216, 356),
-        "a3": (297, 420)
-    }
+    PAPER_SIZES = PAPER_SIZES
 
     def __init__(self, title="Paper Settings", parent=None):
         super().__init__(title, parent)
@@ -274,6 +473,8 @@ class PaperSettings(QGroupBox):
 class TypewriterSettings(QGroupBox):
     settingsChanged = pyqtSignal()
 
+    INK_ENGINES = ["classic", "raster"]
+
     def __init__(self, title="Simulation Settings", parent=None):
         super().__init__(title, parent)
         self.setup_ui()
@@ -324,15 +525,37 @@ class TypewriterSettings(QGroupBox):
         self.ink_effect_prob.setSingleStep(0.050)
         layout.addRow("Ink Effect Probability:", self.ink_effect_prob)
 
+        #Classic redraws every affected glyph, raster post-processes the page buffer
+        self.ink_engine = QComboBox()
+        self.ink_engine.addItems(self.INK_ENGINES)
+        layout.addRow("Ink Effects Engine:", self.ink_engine)
+
         #Live preview toggle
         self.auto_update = QCheckBox("Live Preview (Uncheck when loading project)")
         self.auto_update.setChecked(False)
         layout.addRow(self.auto_update)
 
+        #Live preview renders without ink effects or antialiasing while typing,
+        #full quality follows once typing pauses
+        self.draft_preview = QCheckBox("Draft Preview While Typing")
+        self.draft_preview.setChecked(True)
+        layout.addRow(self.draft_preview)
+
+        #Memory for page images, older pages are compressed or spilled to disk beyond it
+        self.memory_budget = QSpinBox()
+        self.memory_budget.setRange(64, 16384)  #MB
+        self.memory_budget.setValue(DEFAULT_BUDGET // (1024 * 1024))
+        self.memory_budget.setSingleStep(64)
+        layout.addRow("Page Memory (MB):", self.memory_budget)
+
         #Connect all controls to emit settingsChanged
-        for widget in self.findChildren((QSpinBox, QDoubleSpinBox, QCheckBox)):
+        for widget in self.findChildren((QSpinBox, QDoubleSpinBox, QCheckBox, QComboBox)):
+            if widget is self.memory_budget or widget is self.draft_preview:
+                continue  #Does not change how pages look
             if isinstance(widget, (QSpinBox, QDoubleSpinBox)):
                 widget.valueChanged.connect(self.settingsChanged.emit)
+            elif isinstance(widget, QComboBox):
+                widget.currentIndexChanged.connect(self.settingsChanged.emit)
             else:
                 widget.stateChanged.connect(self.settingsChanged.emit)
 
@@ -355,3 +578,135 @@ class TypewriterSettings(QGroupBox):
     def get_effect_scale(self, dpi):
         #Return a scaling factor for effects based on font size
         return self.get_font_size_pixels(dpi) / 12.0
+
+    def get_memory_budget(self):
+        return self.memory_budget.value() * 1024 * 1024
+
+
+class ExportSettings(QGroupBox):
+    #Encoding of exported pages, see export.EXPORT_PROFILES
+    PROFILES = ["color", "gray", "bitonal", "jpeg"]
+
+    def __init__(self, title="Export Settings", parent=None):
+        super().__init__(title, parent)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QFormLayout()
+
+        self.profile = QComboBox()
+        self.profile.addItems(self.PROFILES)
+        layout.addRow("Profile:", self.profile)
+
+        self.quality = QSpinBox()
+        self.quality.setRange(10, 100)
+        self.quality.setValue(85)
+        self.quality.setSingleStep(5)
+        layout.addRow("JPEG Quality:", self.quality)
+
+        #Downsample pages to this DPI on export, full resolution at 0
+        self.dpi = QSpinBox()
+        self.dpi.setRange(0, 600)
+        self.dpi.setValue(0)
+        self.dpi.setSingleStep(50)
+        self.dpi.setSpecialValueText("Full")
+        layout.addRow("Export DPI:", self.dpi)
+
+        self.profile.currentTextChanged.connect(
+            lambda profile: self.quality.setEnabled(profile == "jpeg"))
+        self.quality.setEnabled(False)
+
+        self.setLayout(layout)
+
+    def get_profile_options(self):
+        return (self.profile.currentText(), self.quality.value(), self.dpi.value() or None)
+
+
+class ThumbnailSignals(QObject):
+    finished = pyqtSignal(int, int, QImage)
+
+
+class ThumbnailJob(QRunnable):
+    #Downscales a finished page on a pool thread
+
+    def __init__(self, index, version, page, size):
+        super().__init__()
+        self.index = index
+        self.version = version
+        self.page = page
+        self.size = size
+        self.signals = ThumbnailSignals()
+
+    def run(self):
+        thumbnail = self.page.scaled(
+            self.size,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+        self.page = None
+        self.signals.finished.emit(self.index, self.version, thumbnail)
+
+
+class ThumbnailStrip(QListWidget):
+    #Overview of the document, one small preview per page. Thumbnails are
+    #scaled off the GUI thread and only redone for pages whose content changed
+    pageSelected = pyqtSignal(int)
+
+    THUMBNAIL_WIDTH = 100  #px
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMovement(QListView.Movement.Static)
+        self.setUniformItemSizes(True)
+        self.setIconSize(QSize(self.THUMBNAIL_WIDTH, int(self.THUMBNAIL_WIDTH * 1.414)))
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setFixedWidth(self.THUMBNAIL_WIDTH + 60)
+        self.itemClicked.connect(lambda item: self.pageSelected.emit(self.row(item)))
+
+        self.pool = QThreadPool.globalInstance()
+        #Per page: key of the content the thumbnail shows, and a version that
+        #tells results of superseded jobs apart
+        self.keys = []
+        self.versions = []
+        self.jobs = {}
+
+    def setPageCount(self, count):
+        #Keep existing thumbnails, pages that did not change keep theirs
+        while self.count() > count:
+            self.takeItem(self.count() - 1)
+            self.keys.pop()
+            self.versions.pop()
+        while self.count() < count:
+            self.addItem(QListWidgetItem(str(self.count() + 1)))
+            self.keys.append(None)
+            self.versions.append(0)
+
+    def updatePage(self, index, page, key=None):
+        #key identifies the page content, None if it is not known
+        if index >= self.count():
+            self.setPageCount(index + 1)
+        if key is not None and key == self.keys[index]:
+            return
+        self.keys[index] = key
+        self.versions[index] += 1
+        if index == 0:
+            #Size the thumbnails after the paper
+            self.setIconSize(QSize(
+                self.THUMBNAIL_WIDTH,
+                int(self.THUMBNAIL_WIDTH * page.height() / page.width())
+            ))
+
+        job = ThumbnailJob(index, self.versions[index], page, self.iconSize())
+        job.signals.finished.connect(self.setThumbnail)
+        self.jobs[(index, self.versions[index])] = job
+        self.pool.start(job)
+
+    def setThumbnail(self, index, version, thumbnail):
+        self.jobs.pop((index, version), None)
+        if index < self.count() and self.versions[index] == version:
+            self.item(index).setIcon(QIcon(QPixmap.fromImage(thumbnail)))
+
+    def showCurrentPage(self, current, total):
+        #Follows the preview's pageChanged, does not emit pageSelected
+        if 0 < current <= self.count():
+            self.setCurrentRow(current - 1)